@@ -0,0 +1,329 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.suite import parse_rows  # noqa: E402
+from taxinsight.memo import cache_stats  # noqa: E402
+
+APP = os.path.join(REPO_ROOT, 'tax_consult.py')
+
+# The horizontal menu is a custom component, which the headless test API
+# cannot click; this stand-in returns the option a simulated user picked
+SCRIPT = f'''
+import streamlit as st
+import streamlit_option_menu
+
+streamlit_option_menu.option_menu = lambda *args, **kwargs: st.session_state.get('load_test_menu', 'Home')
+exec(compile(open({APP!r}).read(), {APP!r}, 'exec'))
+'''
+
+MENU = ('Home', 'Salaried', 'Business', 'Senior Citizens')
+CALCULATOR_PAGES = MENU[1:]
+SECTIONS = ('Tax Calculator', 'Learning Manual')
+
+# What a simulated user does next, with relative weights
+ACTIONS = {
+    'switch page': 1,
+    'switch section': 1,
+    'change input': 4,
+    'change regime': 2,
+    'calculate': 3,
+}
+
+DEFAULT_USERS = (1, 5, 10)
+DEFAULT_DURATION = 30.0
+DEFAULT_THINK = 0.0
+SAMPLE_INTERVAL = 1.0
+
+
+def rss_bytes():
+    # Current resident set size; peak RSS where /proc is unavailable
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def figure_count():
+    # The charts draw on Figure objects outside pyplot, so pyplot's figure
+    # list stays empty; count the live instances instead
+    figure = getattr(sys.modules.get('matplotlib.figure'), 'Figure', None)
+    if figure is None:
+        return 0
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, figure))
+
+
+# Streamlit releases share_runtime was checked against, oldest and newest
+# (major, minor). It patches private runtime internals that any release may
+# change, so other versions stop with an error rather than misbehave.
+SHARED_RUNTIME_VERSIONS = ((1, 37), (1, 65))
+
+
+def share_runtime():
+    # AppTest installs a mock Runtime for each run and removes it when the
+    # run ends, which breaks any other session still running. A server has
+    # one Runtime for every session, so keep one around for those gaps.
+    # Streamlit has no public hook for this, hence the patches below.
+    import streamlit
+    from packaging.version import Version
+
+    version = Version(streamlit.__version__).release[:2]
+    oldest, newest = SHARED_RUNTIME_VERSIONS
+    if not oldest <= version <= newest:
+        raise RuntimeError(
+            f'The load test shares a mock Streamlit runtime through private internals checked on Streamlit '
+            f'{oldest[0]}.{oldest[1]} to {newest[0]}.{newest[1]}, not {streamlit.__version__}; '
+            f'check share_runtime against this release and update SHARED_RUNTIME_VERSIONS.'
+        )
+
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.media_file_manager import MediaFileManager
+
+    if not hasattr(Runtime, '_instance'):
+        raise RuntimeError(f'streamlit.runtime.Runtime has no _instance in Streamlit {streamlit.__version__}; share_runtime needs updating.')
+
+    # Built like AppTest's own mock: st.image and friends store their bytes
+    # in media_file_mgr, and st.cache_data asks cache_storage_manager for
+    # storage, so both must be real objects rather than MagicMock attributes
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    # AppTest sets Runtime._instance to its mock for a run and back to None
+    # after it; a session still running then finds no Runtime through
+    # Runtime.instance(), so fall back to the shared one in that gap
+    Runtime.instance = classmethod(lambda cls: cls._instance if cls._instance is not None else shared)
+
+
+def cache_entries():
+    return sum(stats['size'] for name, stats in cache_stats().items() if name != 'disk')
+
+
+class Session:
+    # One simulated user: a headless app session and the actions it takes
+    def __init__(self, number, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.rng = random.Random(seed)
+        self.app = AppTest.from_string(SCRIPT, default_timeout=timeout)
+        self.menu = 'Home'
+        self.latencies = {}
+        self.errors = 0
+
+    def rerun(self, action):
+        started = time.perf_counter()
+        self.app.run()
+        self.latencies.setdefault(action, []).append(time.perf_counter() - started)
+        if self.app.exception:
+            self.errors += 1
+
+    def step(self):
+        if self.menu == 'Home':
+            action = 'switch page'
+        else:
+            action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        # Widgets inside a form only send their values on submit; in a
+        # browser, editing them does not rerun anything
+        if getattr(self, action.replace(' ', '_'))() is not False:
+            self.rerun(action)
+
+    def switch_page(self):
+        self.menu = self.rng.choice([option for option in MENU if option != self.menu] if self.menu == 'Home' else MENU)
+        self.app.session_state['load_test_menu'] = self.menu
+
+    def switch_section(self):
+        for selectbox in self.app.selectbox:
+            if selectbox.label == 'Select an Option':
+                selectbox.set_value(self.rng.choice(SECTIONS))
+
+    def change_input(self):
+        inputs = list(self.app.number_input)
+        if not inputs:
+            return False
+        widget = self.rng.choice(inputs)
+        value = widget.value or 0
+        new = value * self.rng.uniform(0.5, 2.0) if value else self.rng.uniform(0, 200000)
+        if widget.min is not None:
+            new = max(new, widget.min)
+        if widget.max is not None:
+            new = min(new, widget.max)
+        widget.set_value(type(value)(new) if isinstance(value, (int, float)) else new)
+        return not widget.form_id
+
+    def change_regime(self):
+        for selectbox in self.app.selectbox:
+            if selectbox.label == 'Choose Tax Regime':
+                selectbox.set_value(self.rng.choice(selectbox.options))
+                return True
+        return False
+
+    def calculate(self):
+        for button in self.app.button:
+            if button.label == 'Calculate Tax':
+                button.click()
+                return
+
+
+def sample(samples, started, sessions, stop):
+    # Process-wide memory, cache and figure counts over time
+    while True:
+        samples.append({
+            'seconds': time.perf_counter() - started,
+            'rss_mb': rss_bytes() / 2**20,
+            'cache_entries': cache_entries(),
+            'figures': figure_count(),
+            'reruns': sum(len(values) for session in sessions for values in session.latencies.values()),
+        })
+        if stop.wait(SAMPLE_INTERVAL):
+            return
+
+
+def percentiles(values):
+    if not values:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {'count': len(values), 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': max(values) * 1000}
+
+
+def warm_up(timeout):
+    # Import every page and draw each calculator once, so the first level
+    # does not count one-off imports as per-session memory
+    session = Session(-1, 0, timeout)
+    session.rerun('load')
+    for menu in CALCULATOR_PAGES:
+        session.app.session_state['load_test_menu'] = menu
+        session.rerun('switch page')
+        session.calculate()
+        session.rerun('calculate')
+
+
+def run_level(users, duration, think, seed, timeout):
+    # `users` sessions, each on its own thread as under a Streamlit server,
+    # taking actions until `duration` seconds have passed
+    gc.collect()
+    baseline = rss_bytes()
+    sessions = [Session(number, seed + number, timeout) for number in range(users)]
+    samples = []
+    stop = threading.Event()
+    started = time.perf_counter()
+    sampler = threading.Thread(target=sample, args=(samples, started, sessions, stop), daemon=True)
+    sampler.start()
+
+    def drive(session):
+        session.rerun('load')
+        while time.perf_counter() - started < duration:
+            session.step()
+            if think:
+                time.sleep(session.rng.expovariate(1 / think))
+
+    threads = [threading.Thread(target=drive, args=(session,), name=f'load-user-{session.number}') for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    sampler.join()
+
+    elapsed = time.perf_counter() - started
+    by_action = {}
+    for session in sessions:
+        for action, values in session.latencies.items():
+            by_action.setdefault(action, []).extend(values)
+    every = [value for values in by_action.values() for value in values]
+    peak = max(entry['rss_mb'] for entry in samples)
+    return {
+        'users': users,
+        'seconds': elapsed,
+        'reruns': len(every),
+        'reruns_per_second': len(every) / elapsed if elapsed else 0.0,
+        'errors': sum(session.errors for session in sessions),
+        'latency': percentiles(every),
+        'latency_by_action': {action: percentiles(values) for action, values in sorted(by_action.items())},
+        'rss_baseline_mb': baseline / 2**20,
+        'rss_peak_mb': peak,
+        'mb_per_session': (peak - baseline / 2**20) / users,
+        'cache_entries': {'start': samples[0]['cache_entries'], 'end': samples[-1]['cache_entries']},
+        'figures': {'max': max(entry['figures'] for entry in samples), 'end': samples[-1]['figures']},
+        'timeline': samples,
+    }
+
+
+def print_level(level):
+    latency = level['latency']
+    print(
+        f"{level['users']:4} users  {level['reruns']:6} reruns  {level['reruns_per_second']:7.1f}/s  "
+        f"p50 {latency.get('p50_ms', 0):8.1f}  p95 {latency.get('p95_ms', 0):8.1f}  p99 {latency.get('p99_ms', 0):8.1f} ms  "
+        f"{level['mb_per_session']:6.1f} MB/session  cache {level['cache_entries']['start']}->{level['cache_entries']['end']}  "
+        f"figures max {level['figures']['max']}  errors {level['errors']}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load', description='Drive simulated concurrent users through tax_consult.py and report rerun latency and memory.')
+    parser.add_argument('--users', type=parse_rows, default=DEFAULT_USERS, help='comma-separated concurrent session counts, run one after another (default: 1,5,10)')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='seconds per session count (default: %(default)s)')
+    parser.add_argument('--think', type=float, default=DEFAULT_THINK, help='mean pause between a user\'s actions, in seconds (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds a single rerun may take (default: %(default)s)')
+    parser.add_argument('--output', default='load.json')
+    args = parser.parse_args(argv)
+
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        print('Error: the load test needs streamlit.testing, which ships with Streamlit 1.28 and later.', file=sys.stderr)
+        return 1
+
+    try:
+        share_runtime()
+    except RuntimeError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    # The app reads its assets relative to the working directory
+    os.chdir(REPO_ROOT)
+    warm_up(args.timeout)
+    levels = []
+    for users in args.users:
+        level = run_level(users, args.duration, args.think, args.seed, args.timeout)
+        print_level(level)
+        levels.append(level)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'duration': args.duration,
+            'think': args.think,
+        },
+        'levels': levels,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {len(levels)} load levels to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pages import business_profession, salaried, senior_citizens  # noqa: E402
+from taxinsight import memo  # noqa: E402
+from taxinsight.analytics import CohortSummary  # noqa: E402
+from taxinsight.optimizer import optimize_columns  # noqa: E402
+from taxinsight.paise import calculate_tax_paise  # noqa: E402
+from taxinsight.segments import calculate_tax_columns  # noqa: E402
+
+DEFAULT_BATCH_ROWS = (10000, 1000000, 10000000)
+BATCH_CHUNK = 1000000
+DEFAULT_THRESHOLD = 0.10
+
+# Slab functions and how to call them for one income
+SLAB_FUNCTIONS = {
+    'salaried.old_tax_regime_salaried': lambda income: salaried.old_tax_regime_salaried(income, 30),
+    'salaried.new_tax_regime_salaried': salaried.new_tax_regime_salaried,
+    'salaried.old_tax_regime_nri': salaried.old_tax_regime_nri,
+    'salaried.new_tax_regime_nri': salaried.new_tax_regime_nri,
+    'business_profession.old_tax_regime_business': lambda income: business_profession.old_tax_regime_business(income, 30),
+    'business_profession.new_tax_regime_business': lambda income: business_profession.new_tax_regime_business(income, 30),
+    'senior_citizens.senior_citizen_old_tax_regime': lambda income: senior_citizens.senior_citizen_old_tax_regime(income, 65),
+    'senior_citizens.senior_citizen_new_tax_regime': lambda income: senior_citizens.senior_citizen_new_tax_regime(income, 65),
+    'senior_citizens.super_senior_citizen_old_tax_regime': lambda income: senior_citizens.super_senior_citizen_old_tax_regime(income, 85),
+    'senior_citizens.super_senior_citizen_new_tax_regime': lambda income: senior_citizens.super_senior_citizen_new_tax_regime(income, 85),
+}
+
+# Default calculator inputs per segment, matching the page defaults
+CALCULATE_TAX_CALLS = {
+    'salaried': (salaried.calculate_tax, ('Resident', 'Old Tax Regime', 30, 500000, 0, 0, 0, 0, 0, 0, 0, 0)),
+    'business': (business_profession.calculate_tax, (30, 'Old Tax Regime', 500000, 0, 0, 0, 0, 0, 0, 0, 0)),
+    'senior': (senior_citizens.calculate_tax, (60, 'Old Tax Regime', 500000, 0, 0, 0, 0, 0, 0)),
+}
+
+PAGES = ('salaried', 'business_profession', 'senior_citizens')
+
+
+def measure(func, ops, repeats):
+    # Seconds per operation over several repeats of a call that performs `ops` operations
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) / ops)
+    return {'per_op': statistics.median(samples), 'min': min(samples), 'ops': ops, 'repeats': repeats}
+
+
+def bench_slabs(repeats):
+    incomes = np.linspace(0, 5000000, 1000).tolist()
+    results = {}
+    for name, func in SLAB_FUNCTIONS.items():
+        def run(func=func):
+            for income in incomes:
+                func(income)
+        results[f'slab/{name}'] = measure(run, len(incomes), repeats)
+    return results
+
+
+def bench_calculate_tax(repeats, calls=10000):
+    results = {}
+    for segment, (func, args) in CALCULATE_TAX_CALLS.items():
+        # Cached: the same profile over and over, as on repeated reruns
+        memo.set_enabled(True)
+        func.cache_clear()
+        results[f'calculate_tax/{segment}/cached'] = measure(lambda: [func(*args) for _ in range(calls)], calls, repeats)
+
+        # Uncached: every call computes
+        memo.set_enabled(False)
+        results[f'calculate_tax/{segment}/uncached'] = measure(lambda: [func(*args) for _ in range(calls)], calls, repeats)
+    memo.set_enabled(True)
+    return results
+
+
+def synthetic_columns(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'residential_status': rng.choice(np.array(['Resident', 'Non-Resident'], dtype=object), rows),
+        'tax_regime': rng.choice(np.array(['Old Tax Regime', 'New Tax Regime'], dtype=object), rows),
+        'age': rng.integers(21, 90, rows).astype(np.float64),
+        'salary': rng.uniform(0, 5000000, rows),
+        'other_income': rng.uniform(0, 100000, rows),
+        'deduction_80c': rng.uniform(0, 150000, rows),
+        'deduction_80d': rng.uniform(0, 25000, rows),
+        'tds': rng.uniform(0, 100000, rows),
+    }
+
+
+def bench_batch(repeats, sizes):
+    # Rows per second for calculate_tax_columns; large sizes run in chunks
+    # so memory stays the same as in a real batch job
+    results = {}
+    chunk = synthetic_columns(min(max(sizes), BATCH_CHUNK))
+    for rows in sizes:
+        def run(rows=rows):
+            remaining = rows
+            while remaining:
+                size = min(remaining, BATCH_CHUNK)
+                calculate_tax_columns('salaried', {name: column[:size] for name, column in chunk.items()})
+                remaining -= size
+        results[f'batch/salaried/{rows}'] = measure(run, rows, repeats if rows <= BATCH_CHUNK else 1)
+    return results
+
+
+def bench_exact(repeats, rows=BATCH_CHUNK):
+    # The integer-paise kernel on the same rows as batch/salaried
+    chunk = synthetic_columns(rows)
+    return {f'exact/salaried/{rows}': measure(lambda: calculate_tax_paise('salaried', chunk), rows, repeats)}
+
+
+def bench_optimizer(repeats, rows=BATCH_CHUNK):
+    chunk = synthetic_columns(rows)
+    budget = np.random.default_rng(1).uniform(0, 300000, rows)
+    return {f'optimizer/salaried/{rows}': measure(lambda: optimize_columns('salaried', chunk, budget), rows, repeats)}
+
+
+def bench_analytics(repeats, rows=BATCH_CHUNK):
+    chunk = synthetic_columns(rows)
+    return {f'analytics/salaried/{rows}': measure(lambda: CohortSummary('salaried').add(chunk), rows, repeats)}
+
+
+def bench_pages(repeats):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        # AppTest ships with Streamlit 1.28 and later
+        return {f'page/{page}/{phase}': {'skipped': 'streamlit.testing unavailable'} for page in PAGES for phase in ('load', 'calculate')}
+
+    results = {}
+    for page in PAGES:
+        script = f'import sys\nsys.path.insert(0, {REPO_ROOT!r})\nfrom pages import {page}\n{page}.main_app()\n'
+        load, calculate = [], []
+        for _ in range(repeats):
+            at = AppTest.from_string(script, default_timeout=60)
+            started = time.perf_counter()
+            at.run()
+            load.append(time.perf_counter() - started)
+            at.button[0].click()
+            started = time.perf_counter()
+            at.run()
+            calculate.append(time.perf_counter() - started)
+        for phase, samples in (('load', load), ('calculate', calculate)):
+            results[f'page/{page}/{phase}'] = {'per_op': statistics.median(samples), 'min': min(samples), 'ops': 1, 'repeats': repeats}
+    return results
+
+
+def run(args):
+    results = {}
+    results.update(bench_slabs(args.repeats))
+    results.update(bench_calculate_tax(args.repeats))
+    results.update(bench_batch(args.repeats, args.rows))
+    results.update(bench_exact(args.repeats))
+    results.update(bench_optimizer(args.repeats))
+    results.update(bench_analytics(args.repeats))
+    if not args.skip_pages:
+        results.update(bench_pages(args.repeats))
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for name, result in results.items():
+        print(f'{name:70} {format_result(result)}')
+    print(f'Wrote {len(results)} results to {args.output}')
+    return 0
+
+
+def format_result(result):
+    if 'skipped' in result:
+        return f"skipped ({result['skipped']})"
+    return f"{result['per_op'] * 1e6:12.3f} µs/op"
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    # Per-benchmark ratio of current to baseline time; above 1 + threshold is a regression
+    rows = []
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None or 'per_op' not in old or 'per_op' not in new:
+            continue
+        ratio = new['per_op'] / old['per_op'] if old['per_op'] else float('inf')
+        rows.append({'name': name, 'baseline': old['per_op'], 'current': new['per_op'], 'ratio': ratio, 'regression': ratio > 1 + threshold})
+    return rows
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_reports(baseline, current, args.threshold)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:70} {row['baseline'] * 1e6:12.3f} -> {row['current'] * 1e6:12.3f} µs/op  x{row['ratio']:.2f} {flag}")
+    regressions = [row for row in rows if row['regression']]
+    print(f'{len(regressions)} regression(s) above {args.threshold:.0%} out of {len(rows)} compared benchmarks')
+    return 1 if regressions else 0
+
+
+def parse_rows(value):
+    return tuple(int(rows) for rows in value.split(','))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description='Benchmark the tax core and the page rerun path.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and write a JSON report')
+    run_parser.add_argument('--output', default='benchmarks.json')
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--rows', type=parse_rows, default=DEFAULT_BATCH_ROWS, help='comma-separated batch sizes (default: 10000,1000000,10000000)')
+    run_parser.add_argument('--skip-pages', action='store_true', help='skip the Streamlit page reruns')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two reports; exits 1 on regressions')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown before flagging, as a fraction (default: %(default)s)')
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,73 +1,32 @@
 import streamlit as st
-import matplotlib.pyplot as plt
+from taxinsight import charts, manual, tracing
+from taxinsight.memo import memoize
+from taxinsight.profile import SeniorProfile
+from taxinsight.rules import get_rules
+from taxinsight.slabs import OLD_REGIME, NEW_REGIME, SENIOR, SUPER_SENIOR
 
 # senior_citizen_old_tax_regime
-@st.cache_data
-def senior_citizen_old_tax_regime(taxable_income, age):
-    slabs = [0, 300000, 500000, 1000000, float('inf')]
-    rates = [0.00, 0.05, 0.20, 0.30]
-    fixed_amounts = [0, 0, 10000, 110000]
-
-    tax = 0
-    for i in range(1, len(slabs)):
-        slab_diff = min(taxable_income, slabs[i]) - slabs[i - 1]
-        tax += fixed_amounts[i - 1] + slab_diff * rates[i - 1]
-        if taxable_income <= slabs[i]:
-            break
-    return tax
+def senior_citizen_old_tax_regime(taxable_income, age, year=None):
+    return get_rules(year).tables[('senior', OLD_REGIME, SENIOR)].tax(taxable_income)
 
 # senior_citizen_new_tax_regime
-@st.cache_data
-def senior_citizen_new_tax_regime(taxable_income, age):
-    slabs = [0, 250000, 500000, 750000, 1000000, 1250000, 1500000, float('inf')]
-    rates = [0.00, 0.05, 0.10, 0.15, 0.20, 0.25, 0.30]
-    fixed_amounts = [0, 0, 12500, 37500, 75000, 125000, 187500]
-
-    tax = 0
-    for i in range(1, len(slabs)):
-        slab_diff = min(taxable_income, slabs[i]) - slabs[i - 1]
-        tax += fixed_amounts[i - 1] + slab_diff * rates[i - 1]
-        if taxable_income <= slabs[i]:
-            break
-    return tax
+def senior_citizen_new_tax_regime(taxable_income, age, year=None):
+    return get_rules(year).tables[('senior', NEW_REGIME, SENIOR)].tax(taxable_income)
 
 # super_senior_citizen_old_tax_regime
-@st.cache_data
-def super_senior_citizen_old_tax_regime(taxable_income, age):
-    slabs = [0, 500000, 1000000, float('inf')]
-    rates = [0.00, 0.20, 0.30]
-    fixed_amounts = [0, 0, 100000]
-
-    tax = 0
-    for i in range(1, len(slabs)):
-        slab_diff = min(taxable_income, slabs[i]) - slabs[i - 1]
-        tax += fixed_amounts[i - 1] + slab_diff * rates[i - 1]
-        if taxable_income <= slabs[i]:
-            break
-    return tax
+def super_senior_citizen_old_tax_regime(taxable_income, age, year=None):
+    return get_rules(year).tables[('senior', OLD_REGIME, SUPER_SENIOR)].tax(taxable_income)
 
 # super_senior_citizen_new_tax_regime
-@st.cache_data
-def super_senior_citizen_new_tax_regime(taxable_income, age):
-    slabs = [0, 250000, 500000, 750000, 1000000, 1250000, 1500000, float('inf')]
-    rates = [0.00, 0.05, 0.10, 0.15, 0.20, 0.25, 0.30]
-    fixed_amounts = [0, 0, 12500, 37500, 75000, 125000, 187500]
-
-    tax = 0
-    for i in range(1, len(slabs)):
-        slab_diff = min(taxable_income, slabs[i]) - slabs[i - 1]
-        tax += fixed_amounts[i - 1] + slab_diff * rates[i - 1]
-        if taxable_income <= slabs[i]:
-            break
-    return tax  
-
-@st.cache_data
-def calculate_tax(age, tax_regime, pension_income, house_property_income, capital_gains, other_income, total_deductions, tds, advance_tax):
-
-    # Validate Inputs
-    inputs = [age, pension_income, house_property_income, capital_gains, other_income, total_deductions, tds, advance_tax]
-    if any(val < 0 for val in inputs):
-        raise ValueError('All values must be non-negative.')
+def super_senior_citizen_new_tax_regime(taxable_income, age, year=None):
+    return get_rules(year).tables[('senior', NEW_REGIME, SUPER_SENIOR)].tax(taxable_income)
+
+@memoize(persist=True)
+def calculate_tax(age, tax_regime, pension_income, house_property_income, capital_gains, other_income, total_deductions, tds, advance_tax, year=None):
+
+    with tracing.span('validation'):
+        # Validate Inputs
+        SeniorProfile(age, tax_regime, pension_income, house_property_income, capital_gains, other_income, total_deductions, tds, advance_tax).validate()
 
     # Calculate Total Income
     total_income = pension_income + house_property_income + capital_gains + other_income
@@ -82,17 +41,17 @@ def calculate_tax(age, tax_regime, pension_income, house_property_income, capita
     # Apply Tax Slabs
     if age < 80:
         if tax_regime == 'New Tax Regime':
-            tax = senior_citizen_new_tax_regime(taxable_income, age)
+            tax = senior_citizen_new_tax_regime(taxable_income, age, year)
         else:
-            tax = senior_citizen_old_tax_regime(taxable_income, age)
+            tax = senior_citizen_old_tax_regime(taxable_income, age, year)
     else:
         if tax_regime == 'New Tax Regime':
-            tax = super_senior_citizen_new_tax_regime(taxable_income, age)
+            tax = super_senior_citizen_new_tax_regime(taxable_income, age, year)
         else:
-            tax = super_senior_citizen_old_tax_regime(taxable_income, age)
+            tax = super_senior_citizen_old_tax_regime(taxable_income, age, year)
 
     # Add Cess
-    tax += tax * 0.04
+    tax += tax * get_rules(year).cess_rate
 
     # Subtract TDS and Advance Tax
     net_tax_payable = tax - tds - advance_tax
@@ -106,81 +65,95 @@ def senior_citizens():
     # Customizing the sidebar appearance
     st.sidebar.title("Navigation")
 
-    navigation = st.sidebar.selectbox("Select an Option", ["Tax Calculator", "Learning Manual"])
+    navigation = st.sidebar.selectbox("Select an Option", ["Tax Calculator", "Upload Cohort", "Learning Manual"])
 
     if navigation == "Tax Calculator":
         main_app()
+    elif navigation == "Upload Cohort":
+        from taxinsight.jobs import cohort_app
+        cohort_app('senior')
     elif navigation == "Learning Manual":
-        description()
+        with tracing.span('learning manual'):
+            description()
 
 def main_app():
-    # Personal Information Section
-    st.info('Note: Default values have been provided for all fields. Please update them according to your financial details.')
-    st.title('Tax Analysis App for Senior Citizens (60 years or more)')
-    st.header('Personal Information')
-    __name__ = st.text_input('Full Name')
-    age = st.number_input('Age', value=60, min_value=60)
-    tax_regime = st.selectbox('Choose Tax Regime', ['Old Tax Regime', 'New Tax Regime'])
-
-    # Income Details Section
-    st.header('Income Details')
-    pension_income = st.number_input('Pension Income', value=500000)
-    house_property_income = st.number_input('House Property Income', value=0)
-    capital_gains = st.number_input('Capital Gains', value=0)
-    other_income = st.number_input('Other Income', value=0)
-
-    # Deductions Section
-    st.header('Deductions')
-    if tax_regime == 'Old Tax Regime':
-        deduction_80c = st.number_input('Section 80C (e.g., EPF, PPF)', value=0, max_value=150000)
-        deduction_80d = st.number_input('Section 80D (Health Insurance)', value=0, max_value=25000)
-        deduction_80g = st.number_input('Section 80G (Donations)', value=0)
-        total_deductions = deduction_80c + deduction_80d + deduction_80g
-    else:
-        total_deductions = 0
-
-    # Tax Paid Section
-    st.header('Tax Paid')
-    tds = st.number_input('TDS (Tax Deducted at Source)', value=0)
-    advance_tax = st.number_input('Advance Tax', value=0)
+    with tracing.span('widgets'):
+        # Personal Information Section
+        st.info('Note: Default values have been provided for all fields. Please update them according to your financial details.')
+        st.title('Tax Analysis App for Senior Citizens (60 years or more)')
+
+        # Inputs are batched in a form, so editing them reruns nothing until Calculate Tax
+        with st.form('senior_inputs'):
+            st.header('Personal Information')
+            __name__ = st.text_input('Full Name')
+            age = st.number_input('Age', value=60, min_value=60)
+
+            # Income Details Section
+            st.header('Income Details')
+            pension_income = st.number_input('Pension Income', value=500000)
+            house_property_income = st.number_input('House Property Income', value=0)
+            capital_gains = st.number_input('Capital Gains', value=0)
+            other_income = st.number_input('Other Income', value=0)
+
+            # Deductions Section
+            st.header('Deductions')
+            st.caption('Deductions apply under the Old Tax Regime only.')
+            deduction_80c = st.number_input('Section 80C (e.g., EPF, PPF)', value=0, max_value=150000)
+            deduction_80d = st.number_input('Section 80D (Health Insurance)', value=0, max_value=25000)
+            deduction_80g = st.number_input('Section 80G (Donations)', value=0)
+
+            # Tax Paid Section
+            st.header('Tax Paid')
+            tds = st.number_input('TDS (Tax Deducted at Source)', value=0)
+            advance_tax = st.number_input('Advance Tax', value=0)
+
+            submitted = st.form_submit_button('Calculate Tax')
+
+    if submitted:
+        st.session_state['senior_profile'] = (age, pension_income, house_property_income, capital_gains, other_income, deduction_80c + deduction_80d + deduction_80g, tds, advance_tax)
 
     # Results Section
     st.header('Results')
-    if st.button('Calculate Tax'):
-        try:
-            net_tax_payable, total_income, total_deductions, taxable_income = calculate_tax(age, tax_regime, pension_income, house_property_income, capital_gains, other_income, total_deductions, tds, advance_tax)
-            
-            # Display the Result
-            st.subheader('Tax Liability Summary')
-            st.write(f'Total Tax Payable with 4% cess: ₹{net_tax_payable}')
-
-            # Income Breakdown Visualization
-            st.subheader('Income Breakdown')
-            income_labels = ['Pension', 'House Property', 'Capital Gains', 'Other']
-            income_values = [pension_income, house_property_income, capital_gains, other_income]
-            fig1, ax1 = plt.subplots(figsize=(10, 6))
-            wedges, texts, autotexts = ax1.pie(income_values, autopct='', startangle=140)
-            ax1.axis('equal') # Equal aspect ratio ensures that pie is drawn as a circle.
-            percentages = [f'{value/sum(income_values)*100:.1f}%' for value in income_values]
-            legend_labels = [f'{label}: {pct}' for label, pct in zip(income_labels, percentages)]
-            ax1.legend(wedges, legend_labels, title="Income Types", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
-            st.pyplot(fig1)
-
-            # Tax Breakdown Visualization
-            st.subheader('Tax Breakdown')
-            tax_labels = ['Total Income', 'Deductions', 'Taxable Income', 'Tax Payable']
-            tax_values = [total_income, total_deductions, taxable_income, net_tax_payable]
-            fig2, ax2 = plt.subplots(figsize=(10, 6))
-            ax2.bar(tax_labels, tax_values)
-            plt.ylabel('Amount (₹)')
-            plt.title('Tax Breakdown')
-            plt.xticks(rotation=45)
-            st.pyplot(fig2)
-
-        except ValueError as e:
-            st.error(f'Error: {str(e)}')
-        except Exception as e:
-            st.error('An unexpected error occurred. Please try again or contact support.')
+    results(st.session_state.get('senior_profile'))
+
+@st.fragment
+def results(profile):
+    # Changing the regime reruns only this fragment, with the inputs last submitted
+    tax_regime = st.selectbox('Choose Tax Regime', ['Old Tax Regime', 'New Tax Regime'], key='senior_tax_regime')
+    if profile is None:
+        return
+    age, pension_income, house_property_income, capital_gains, other_income, total_deductions, tds, advance_tax = profile
+    if tax_regime != 'Old Tax Regime':
+        total_deductions = 0
+    year = st.session_state.get('assessment_year')
+    try:
+        cess = manual.percent(get_rules(year).cess_rate)
+        with tracing.span('calculate_tax'):
+            net_tax_payable, total_income, total_deductions, taxable_income = calculate_tax(age, tax_regime, pension_income, house_property_income, capital_gains, other_income, total_deductions, tds, advance_tax, year=year)
+
+        # Display the Result
+        st.subheader('Tax Liability Summary')
+        st.write(f'Total Tax Payable with {cess} cess: ₹{net_tax_payable:,.2f}')
+
+        # Income Breakdown Visualization
+        st.subheader('Income Breakdown')
+        income_labels = ['Pension', 'House Property', 'Capital Gains', 'Other']
+        income_values = [pension_income, house_property_income, capital_gains, other_income]
+        with tracing.span('pie chart'):
+            charts.income_breakdown(income_labels, income_values)
+
+        # Tax Breakdown Visualization
+        st.subheader('Tax Breakdown')
+        with tracing.span('bar chart'):
+            charts.tax_breakdown([total_income, total_deductions, taxable_income, net_tax_payable])
+
+        st.subheader('Advance Tax')
+        st.write('Resident senior citizens without business income are not required to pay advance tax (section 207), so no interest under sections 234B or 234C applies.')
+
+    except ValueError as e:
+        st.error(f'Error: {str(e)}')
+    except Exception as e:
+        st.error('An unexpected error occurred. Please try again or contact support.')
 
 def description():
     st.markdown("# Tax Insight App Tutorial for Senior Citizens")
@@ -191,11 +164,19 @@ def description():
         st.markdown("- The app considers age-specific tax rules, deductions, and other factors to estimate potential tax liability.")
         st.markdown("- The calculation involves segmenting your income, applying rates to each segment, considering deductions, and incorporating Health and Education Cess.")
 
+    # Slab tables and examples are generated from the rules the calculator applies
+    year = st.session_state.get('assessment_year')
+    example = manual.profile_example(
+        'senior', OLD_REGIME, 65,
+        (('Pension Income', 600000), ('Other Income', 50000)),
+        (('Section 80C', 150000),),
+        tds=5000, advance_tax=2000, year=year,
+    )
     steps = [
         ("Step 1: Personal Information", "Provide basic personal details like Full Name and Age (60 years or more). Age is considered to apply specific tax benefits for senior citizens.", "Example:\n- If you are 80 years or more, different tax slabs may apply."),
-        ("Step 2: Income Details", "Enter various sources of income like Pension Income, House Property Income, Capital Gains, and Other Income.", "For instance:\n- If your Pension Income is ₹500,000, it becomes part of your total income."),
-        ("Step 3: Deductions", "Deductions lower taxable income. They are applicable in the Old Tax Regime only. Deductions decrease the portion subject to taxation.", "For example:\n- If you have a Section 80C deduction of ₹150,000, it's subtracted from total income."),
-        ("Step 4: Tax Paid", "Enter taxes paid via TDS or Advance Tax. This considers taxes paid before calculating final tax liability.", "For example:\n- If you've paid ₹20,000 as TDS and ₹10,000 as Advance Tax, these are subtracted."),
+        ("Step 2: Income Details", "Enter various sources of income like Pension Income, House Property Income, Capital Gains, and Other Income.", "For instance:\n" + example['income']),
+        ("Step 3: Deductions", "Deductions lower taxable income. They are applicable in the Old Tax Regime only. Deductions decrease the portion subject to taxation.", "For example:\n" + example['deductions']),
+        ("Step 4: Tax Paid", "Enter taxes paid via TDS or Advance Tax. This considers taxes paid before calculating final tax liability.", "For example:\n" + example['tax_paid']),
         ("Step 5: Results", "Click 'Calculate Tax' to simulate the process using your data.", "Example:\n- Based on your inputs, the app will calculate the total tax liability, including any applicable cess or surcharge.")
     ]
 
@@ -206,42 +187,10 @@ def description():
             st.write(example)
 
     st.markdown("## Senior Citizen Tax Slabs and Calculations (60 years or more but less than 80 years)")
-
-    st.markdown("### Senior Citizen Tax Slabs (Old Regime)")
-    st.table({
-        "Range": ["₹0 to ₹300,000", "₹300,001 to ₹500,000", "₹500,001 to ₹1,000,000", "Above ₹1,000,000"],
-        "Rate": ["0%", "5%", "20%", "30%"]
-    })
-    st.write("Example Calculation for Taxable Income of ₹3,000,000:")
-    st.write("- ₹300,000 at 0% = ₹0\n- ₹200,000 at 5% = ₹10,000\n- ₹500,000 at 20% = ₹100,000\n- ₹2,000,000 at 30% = ₹600,000\n- Total Tax (Old Regime): ₹710,000")
-
-    st.markdown("### Senior Citizen Tax Slabs (New Regime)")
-    st.table({
-        "Range": ["₹0 to ₹250,000", "₹250,001 to ₹500,000", "₹500,001 to ₹750,000", "₹750,001 to ₹1,000,000", "₹1,000,001 to ₹1,250,000", "₹1,250,001 to ₹1,500,000", "Above ₹1,500,000"],
-        "Rate": ["0%", "5%", "10%", "15%", "20%", "25%", "30%"]
-    })
-    st.write("Example Calculation for Taxable Income of ₹3,000,000:")
-    st.write("- ₹250,000 at 0% = ₹0\n- ₹250,000 at 5% = ₹12,500\n- ₹250,000 at 10% = ₹25,000\n- ₹250,000 at 15% = ₹37,500\n- ₹250,000 at 20% = ₹50,000\n- ₹250,000 at 25% = ₹62,500\n- ₹1,500,000 at 30% = ₹450,000\n- Total Tax (New Regime): ₹837,500")
+    manual.show_slab_section("### Senior Citizen Tax Slabs (Old Regime)", 'senior', OLD_REGIME, 65, 3000000, year)
+    manual.show_slab_section("### Senior Citizen Tax Slabs (New Regime)", 'senior', NEW_REGIME, 65, 3000000, year)
 
     st.markdown("## Super Senior Citizen Tax Slabs and Calculations (80 years or more)")
-
-    st.markdown("### Super Senior Citizen Tax Slabs (Old Regime)")
-    st.table({
-        "Range": ["₹0 to ₹500,000", "₹500,001 to ₹1,000,000", "Above ₹1,000,000"],
-        "Rate": ["0%", "20%", "30%"]
-    })
-    st.write("Example Calculation for Taxable Income of ₹3,000,000:")
-    st.write("- ₹500,000 at 0% = ₹0\n- ₹500,000 at 20% = ₹100,000\n- ₹2,000,000 at 30% = ₹600,000\n- Total Tax (Old Regime): ₹700,000")
-
-    st.markdown("### Super Senior Citizen Tax Slabs (New Regime)")
-    st.table({
-        "Range": ["₹0 to ₹250,000", "₹250,001 to ₹500,000", "₹500,001 to ₹750,000", "₹750,001 to ₹1,000,000", "₹1,000,001 to ₹1,250,000", "₹1,250,001 to ₹1,500,000", "Above ₹1,500,000"],
-        "Rate": ["0%", "5%", "10%", "15%", "20%", "25%", "30%"]
-    })
-    st.write("Example Calculation for Taxable Income of ₹3,000,000:")
-    st.write("- ₹250,000 at 0% = ₹0\n- ₹250,000 at 5% = ₹12,500\n- ₹250,000 at 10% = ₹25,000\n- ₹250,000 at 15% = ₹37,500\n- ₹250,000 at 20% = ₹50,000\n- ₹250,000 at 25% = ₹62,500\n- ₹1,500,000 at 30% = ₹450,000\n- Total Tax (New Regime): ₹837,500")
-
-    st.markdown("### Health and Education Cess")
-    st.write("A 4% cess is added to the calculated tax.")
-    st.write("Example:")
-    st.write("- Total Tax (Old Regime): ₹11,750\n- Health and Education Cess: ₹470 (4% of ₹11,750)\n- Total Tax after Cess: ₹12,220")
\ No newline at end of file
+    manual.show_slab_section("### Super Senior Citizen Tax Slabs (Old Regime)", 'senior', OLD_REGIME, 85, 3000000, year)
+    manual.show_slab_section("### Super Senior Citizen Tax Slabs (New Regime)", 'senior', NEW_REGIME, 85, 3000000, year)
+    manual.show_cess_section('senior', OLD_REGIME, 65, 485000, year)
@@ -1,11 +1,36 @@
+import importlib
+
 import streamlit as st
 from streamlit_option_menu import option_menu
-from pages import home, salaried, business_profession, senior_citizens
+from taxinsight import tracing
+from taxinsight.charts import IMAGE_WIDTH
+
+# Opt-in timing of this rerun (TAXINSIGHT_TRACE=1)
+tracing.start()
+
+# Page modules for each menu option, imported the first time the page is selected
+PAGE_MODULES = {
+    "Home": "pages.home",
+    "Salaried": "pages.salaried",
+    "Business": "pages.business_profession",
+    "Senior Citizens": "pages.senior_citizens",
+}
+
+def load_page(option):
+    with tracing.span('import page'):
+        return importlib.import_module(PAGE_MODULES[option])
+
+# Static files are read once per process and served from memory afterwards
+@st.cache_resource
+def load_asset(path):
+    with open(path, 'rb') as f:
+        return f.read()
 
 # Set the page config with a custom icon
 st.set_page_config(page_title="TaxInsight", layout="wide", initial_sidebar_state="expanded", page_icon="🔍")
 
-st.sidebar.image('taxinsight_option_1.png', use_column_width="always", caption='TaxInsight')
+with tracing.span('sidebar image'):
+    st.sidebar.image(load_asset('taxinsight_option_1.png'), caption='TaxInsight', **IMAGE_WIDTH)
 
 # Remove the Streamlit generated page components on the sidebar
 no_sidebar_style = """
@@ -16,36 +41,45 @@ no_sidebar_style = """
 st.markdown(no_sidebar_style, unsafe_allow_html=True)
 
 # Horizontal menu
-selected = option_menu(
-    menu_title=None,
-    options=[
-        "Home",
-        "Salaried",
-        "Business",
-        "Senior Citizens", # Existing option
-    ],
-    icons=[
-        "house",
-        "wallet",
-        "briefcase",
-        "building",
-    ],
-    menu_icon="cast",
-    default_index=0,
-    orientation="horizontal",
-)
+with tracing.span('navigation menu'):
+    selected = option_menu(
+        menu_title=None,
+        options=[
+            "Home",
+            "Salaried",
+            "Business",
+            "Senior Citizens", # Existing option
+        ],
+        icons=[
+            "house",
+            "wallet",
+            "briefcase",
+            "building",
+        ],
+        menu_icon="cast",
+        default_index=0,
+        orientation="horizontal",
+    )
 
 # Navigation
-if selected == "Home":
-    home.show()
-elif selected == "Salaried":
-    st.info('Note: You can switch between the Tax Calculator and Learning Manual sections using the sidebar navigation on the left.')    
-    salaried.show()
-elif selected == "Business":
-    st.info('Note: You can switch between the Tax Calculator and Learning Manual sections using the sidebar navigation on the left.')    
-    business_profession.show()
-elif selected == "Senior Citizens": # Existing condition
-    st.info('Note: You can switch between the Tax Calculator and Learning Manual sections using the sidebar navigation on the left.')    
-    senior_citizens.show()
-
-st.warning('Please note that this app is based on tax laws as of the 2023 fiscal year. Always consult with a tax professional to ensure compliance with the latest regulations.')
\ No newline at end of file
+page = load_page(selected)
+if selected != "Home":
+    from taxinsight.rules import DEFAULT_YEAR, available_years
+
+    # Assessment year whose rules the calculators apply; read by the pages from session state
+    years = available_years()
+    st.sidebar.selectbox('Assessment Year', years, index=years.index(DEFAULT_YEAR), key='assessment_year')
+    st.info('Note: You can switch between the Tax Calculator, Upload Cohort and Learning Manual sections using the sidebar navigation on the left.')
+with tracing.span(f'page: {selected}'):
+    page.show()
+
+year = st.session_state.get('assessment_year')
+if year:
+    st.warning(f'Please note that this app is based on tax laws for assessment year {year}. Always consult with a tax professional to ensure compliance with the latest regulations.')
+else:
+    st.warning('Please note that this app is based on tax laws as of the 2023 fiscal year. Always consult with a tax professional to ensure compliance with the latest regulations.')
+
+# Debug panel and Chrome trace export for this rerun
+trace = tracing.finish()
+if trace is not None:
+    tracing.render_panel(trace, tracing.export(trace))
@@ -0,0 +1 @@
+# Shared tax core used by the Streamlit pages, the batch tools and the service
@@ -0,0 +1,177 @@
+import argparse
+import datetime
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from taxinsight.batch import DEFAULT_CHUNKSIZE, ResultWriter, input_columns, parse_mapping, read_chunks, resolve_mapping
+from taxinsight.rules import DEFAULT_YEAR, available_years, get_rules
+from taxinsight.segments import CALCULATE_TAX_ARGS, NEGATIVE_VALUES_ERROR, REQUIRED_FIELDS, SEGMENTS, calculate_tax_columns
+
+# Advance tax installments (section 211): due day and month in the financial
+# year, and the share of the assessed tax that must be paid by then
+INSTALLMENTS = (
+    ('jun', (6, 15), 0.15),
+    ('sep', (9, 15), 0.45),
+    ('dec', (12, 15), 0.75),
+    ('mar', (3, 15), 1.00),
+)
+
+# Section 234C: months of interest per installment, and the share paid that
+# avoids interest for the June and September installments
+INTEREST_MONTHS_234C = (3, 3, 3, 1)
+SAFE_HARBOUR_234C = (0.12, 0.36, None, None)
+
+INTEREST_RATE = 0.01  # per month or part of a month, sections 234B and 234C
+MINIMUM_ADVANCE_TAX = 10000  # section 208
+SECTION_234B_SHARE = 0.90
+
+# Interest is charged on amounts rounded down to a multiple of ₹100 (rule 119A)
+INTEREST_ROUNDING = 100
+
+# Resident senior citizens without business income pay no advance tax
+# (section 207); the senior citizens page has no business income
+EXEMPT_SEGMENTS = ('senior',)
+
+# Amount paid towards each installment; a single advance_tax figure counts
+# as paid with the last installment
+INSTALLMENT_FIELDS = tuple(f'advance_tax_{name}' for name, _, _ in INSTALLMENTS)
+
+SCHEDULE_FIELDS = ('assessed_tax',) + tuple(f'due_{name}' for name, _, _ in INSTALLMENTS) + ('interest_234b', 'interest_234c', 'total_interest')
+
+
+def due_dates(year=None):
+    # Installment due dates in the financial year before the assessment year
+    start = int(get_rules(year).year[:4]) - 1
+    return tuple(datetime.date(start + (month < 4), month, day) for _, (month, day), _ in INSTALLMENTS)
+
+
+def months_234b(filing_date, year=None):
+    # Months or parts of months from 1 April of the assessment year to the
+    # filing date; interest runs for at least one month when it applies
+    start = int(get_rules(year).year[:4])
+    months = (filing_date.year - start) * 12 + filing_date.month - 3
+    return max(months, 1)
+
+
+def default_filing_date(year=None):
+    # Due date of the return for non-audit cases: 31 July of the assessment year
+    return datetime.date(int(get_rules(year).year[:4]), 7, 31)
+
+
+def round_down(amount):
+    return np.floor(amount / INTEREST_ROUNDING) * INTEREST_ROUNDING
+
+
+def schedule_columns(segment, columns, year=None, filing_date=None):
+    # Installment schedule and interest for a whole client book in one pass.
+    # Assessed tax is the calculate_tax result before advance tax, i.e. tax
+    # with cess less TDS. Installment columns give what was paid towards each
+    # due date; without them, advance_tax counts as paid on 15 March.
+    if segment not in CALCULATE_TAX_ARGS:
+        raise ValueError(f'Unknown segment: {segment}')
+    if REQUIRED_FIELDS[segment][0] not in columns:
+        raise ValueError(f'Missing required column: {REQUIRED_FIELDS[segment][0]}')
+    size = len(columns[REQUIRED_FIELDS[segment][0]])
+    base = dict(columns)
+    base['advance_tax'] = np.zeros(size)
+    results = calculate_tax_columns(segment, base, year)
+    error = results['error'].copy()
+    invalid = error != ''
+    assessed = np.where(invalid, 0.0, np.maximum(results['net_tax_payable'], 0.0))
+    if segment in EXEMPT_SEGMENTS:
+        assessed[:] = 0.0
+    liable = assessed >= MINIMUM_ADVANCE_TAX
+
+    if any(name in columns for name in INSTALLMENT_FIELDS):
+        paid = [np.nan_to_num(np.asarray(columns.get(name, np.zeros(size)), dtype=np.float64)) for name in INSTALLMENT_FIELDS]
+    else:
+        total = np.nan_to_num(np.asarray(columns.get('advance_tax', np.zeros(size)), dtype=np.float64))
+        paid = [np.zeros(size)] * (len(INSTALLMENTS) - 1) + [total]
+    negative = np.logical_or.reduce([column < 0 for column in paid])
+    error[negative & ~invalid] = NEGATIVE_VALUES_ERROR
+    invalid |= negative
+
+    output = {'assessed_tax': assessed}
+    interest_234c = np.zeros(size)
+    cumulative = np.zeros(size)
+    for (name, _, share), paid_now, months, safe in zip(INSTALLMENTS, paid, INTEREST_MONTHS_234C, SAFE_HARBOUR_234C):
+        due = np.where(liable, assessed * share, 0.0)
+        output[f'due_{name}'] = due
+        cumulative += paid_now
+        shortfall = due - cumulative
+        if safe is not None:
+            shortfall[cumulative >= assessed * safe] = 0.0
+        interest_234c += round_down(np.maximum(shortfall, 0.0)) * INTEREST_RATE * months
+
+    months = months_234b(filing_date or default_filing_date(year), year)
+    short = liable & (cumulative < assessed * SECTION_234B_SHARE)
+    interest_234b = np.where(short, round_down(np.maximum(assessed - cumulative, 0.0)) * INTEREST_RATE * months, 0.0)
+
+    output['interest_234b'] = interest_234b
+    output['interest_234c'] = np.where(liable, interest_234c, 0.0)
+    output['total_interest'] = output['interest_234b'] + output['interest_234c']
+    for column in output.values():
+        column[invalid] = np.nan
+    output['error'] = error
+    return output
+
+
+def run_schedule(segment, input_path, output_path, mapping=None, keep=(), chunksize=DEFAULT_CHUNKSIZE, year=None, filing_date=None):
+    # Stream a client book chunk by chunk; memory stays flat however large it is
+    if segment not in SEGMENTS:
+        raise ValueError(f'Unknown segment: {segment}')
+    year = get_rules(year).year
+    available = input_columns(input_path)
+    mapping = dict(mapping or {})
+    explicit = {name: mapping.pop(name) for name in INSTALLMENT_FIELDS if name in mapping}
+    installments = {name: explicit.get(name, name) for name in INSTALLMENT_FIELDS}
+    missing = [column for column in explicit.values() if column not in available]
+    if missing:
+        raise ValueError(f'Column not found in input: {", ".join(missing)}')
+    resolved = resolve_mapping(segment, available, mapping)
+    resolved.update({name: column for name, column in installments.items() if column in available})
+    missing_keep = [column for column in keep if column not in available]
+    if missing_keep:
+        raise ValueError(f'Column not found in input: {", ".join(missing_keep)}')
+
+    started = time.perf_counter()
+    rows = errors = 0
+    columns = list(dict.fromkeys(list(keep) + list(resolved.values())))
+    with ResultWriter(output_path, SCHEDULE_FIELDS) as writer:
+        for frame in read_chunks(input_path, columns, chunksize):
+            values = {name: frame[column].to_numpy() for name, column in resolved.items()}
+            result = schedule_columns(segment, values, year, filing_date)
+            output = {column: frame[column].to_numpy() for column in keep}
+            output.update(result)
+            writer.write(pd.DataFrame(output, index=frame.index))
+            rows += len(frame)
+            errors += int((result['error'] != '').sum())
+    seconds = time.perf_counter() - started
+    return {'year': year, 'rows': rows, 'errors': errors, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m taxinsight.advance', description='Advance tax installments and section 234B/234C interest for a CSV or Parquet client book.')
+    parser.add_argument('segment', choices=SEGMENTS, help='calculator to apply to every row')
+    parser.add_argument('input', help='input .csv or .parquet file')
+    parser.add_argument('output', help='output .csv or .parquet file')
+    parser.add_argument('--map', dest='mapping', action='append', metavar='ARGUMENT=COLUMN', help=f'read a calculate_tax argument or one of {", ".join(INSTALLMENT_FIELDS)} from a differently named column (repeatable)')
+    parser.add_argument('--keep', action='append', default=[], metavar='COLUMN', help='copy an input column, such as a client id, to the output (repeatable)')
+    parser.add_argument('--year', choices=available_years(), default=DEFAULT_YEAR, help='assessment year whose rules apply (default: %(default)s)')
+    parser.add_argument('--filing-date', type=datetime.date.fromisoformat, help='date the return is filed, for section 234B (default: 31 July of the assessment year)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per chunk (default: %(default)s)')
+    args = parser.parse_args(argv)
+    try:
+        summary = run_schedule(args.segment, args.input, args.output, parse_mapping(args.mapping), args.keep, args.chunksize, args.year, args.filing_date)
+    except (ValueError, argparse.ArgumentTypeError, FileNotFoundError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    print(f"Scheduled {summary['rows']} clients for AY {summary['year']} ({summary['errors']} with errors) in {summary['seconds']:.2f}s, {summary['rows_per_second']:.0f} rows/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import numpy as np
+
+from taxinsight.batch import DEFAULT_CHUNKSIZE, input_columns, read_chunks
+from taxinsight.rules import get_rules
+from taxinsight.segments import CALCULATE_TAX_ARGS, LABEL_DEFAULTS, NEW_REGIME_DEDUCTIONS, RESULT_FIELDS, calculate_tax_columns, label_columns, table_groups
+from taxinsight.slabs import NEW_REGIME, NEW_REGIME_LABELS, OLD_REGIME
+
+# Fixed bin edges, so chunk histograms add up; values past the ends land in
+# the outermost bins
+EFFECTIVE_RATE_EDGES = np.linspace(0.0, 0.35, 71)  # 0.5 % of total income
+SAVINGS_EDGES = np.linspace(-200000.0, 200000.0, 81)  # ₹5,000 of old minus new regime tax
+
+REGIME_LABELS = {OLD_REGIME: 'Old Tax Regime', NEW_REGIME: 'New Tax Regime'}
+
+
+def histogram(values, edges):
+    counts, _ = np.histogram(np.clip(values, edges[0], edges[-1]), edges)
+    return counts
+
+
+def with_regime(labels, regime, size):
+    return {**labels, 'tax_regime': np.full(size, REGIME_LABELS[regime], dtype=object)}
+
+
+def slab_tax(segment, labels, ages, taxable_income, valid, rules):
+    # Slab tax before cess of every valid row, under the regime in `labels`
+    tax = np.zeros(len(taxable_income))
+    for table, _, mask in table_groups(segment, labels, ages, rules):
+        mask &= valid
+        tax[mask] = table.tax(taxable_income[mask])
+    return tax
+
+
+class CohortSummary:
+    # Bins and totals describing a whole cohort. Chunks are added one at a
+    # time and only these aggregates are kept, so the page draws charts for
+    # millions of rows from a few hundred numbers.
+    def __init__(self, segment, year=None):
+        self.segment = segment
+        self.year = get_rules(year).year
+        self.rows = self.errors = self.new_better = self.compared = 0
+        self.tax = self.cess = self.total_income = 0.0
+        self.effective_rate = np.zeros(len(EFFECTIVE_RATE_EDGES) - 1, dtype=np.int64)
+        self.savings = np.zeros(len(SAVINGS_EDGES) - 1, dtype=np.int64)
+        self.occupancy = {}  # (regime, slab rate) -> rows
+
+    def add(self, columns):
+        # One chunk of calculate_tax input columns
+        return self.add_results(columns, calculate_tax_columns(self.segment, columns, self.year))
+
+    def add_results(self, columns, results):
+        # One chunk of calculate_tax_columns results, e.g. a batch output
+        # file; `columns` only needs age and the regime labels. The other
+        # regime's tax for the savings is a slab lookup on the taxable income
+        # it would have, rather than a second computation: the same as the
+        # chosen one, except where the New Tax Regime allows no deductions
+        # (seniors), which leaves total income.
+        rules = get_rules(self.year)
+        taxable_income = np.asarray(results['taxable_income'], dtype=np.float64)
+        size = len(taxable_income)
+        valid = ~np.isnan(taxable_income)
+        labels = label_columns(self.segment, columns, size)
+        ages = np.nan_to_num(np.asarray(columns['age'], dtype=np.float64))
+        old_labels = with_regime(labels, OLD_REGIME, size)
+        new_labels = with_regime(labels, NEW_REGIME, size)
+
+        # Tax of the regime each row chose, on the taxable income reported for it
+        chose_new = np.isin(labels['tax_regime'], NEW_REGIME_LABELS)
+        old = slab_tax(self.segment, old_labels, ages, taxable_income, valid, rules)
+        new = slab_tax(self.segment, new_labels, ages, taxable_income, valid, rules)
+        tax = np.where(chose_new, new, old)
+        if not NEW_REGIME_DEDUCTIONS[self.segment]:
+            new = slab_tax(self.segment, new_labels, ages, np.asarray(results['total_income'], dtype=np.float64), valid, rules)
+
+        # Rate of the slab each row ends in, under the regime it chose
+        for table, regime, mask in table_groups(self.segment, labels, ages, rules):
+            mask &= valid
+            slab_rates, counts = np.unique(table.rates[table.bracket(taxable_income[mask])], return_counts=True)
+            for rate, count in zip(slab_rates.tolist(), counts.tolist()):
+                self.occupancy[(regime, rate)] = self.occupancy.get((regime, rate), 0) + count
+
+        tax_with_cess = tax[valid] * (1 + rules.cess_rate)
+        total_income = np.asarray(results['total_income'], dtype=np.float64)[valid]
+        effective = np.divide(tax_with_cess, total_income, out=np.zeros_like(tax_with_cess), where=total_income > 0)
+        self.effective_rate += histogram(effective, EFFECTIVE_RATE_EDGES)
+
+        # Prepaid tax is the same under both regimes, so it cancels out
+        savings = (old[valid] - new[valid]) * (1 + rules.cess_rate)
+        self.savings += histogram(savings, SAVINGS_EDGES)
+        self.new_better += int((savings > 0).sum())
+        self.compared += len(savings)
+
+        self.rows += size
+        self.errors += size - int(valid.sum())
+        self.tax += float(tax_with_cess.sum())
+        self.cess += float(tax[valid].sum() * rules.cess_rate)
+        self.total_income += float(total_income.sum())
+        return self
+
+    def merge(self, other):
+        if other.segment != self.segment or other.year != self.year:
+            raise ValueError('Only summaries of the same segment and year can be merged.')
+        self.rows += other.rows
+        self.errors += other.errors
+        self.new_better += other.new_better
+        self.compared += other.compared
+        self.tax += other.tax
+        self.cess += other.cess
+        self.total_income += other.total_income
+        self.effective_rate += other.effective_rate
+        self.savings += other.savings
+        for key, count in other.occupancy.items():
+            self.occupancy[key] = self.occupancy.get(key, 0) + count
+        return self
+
+    @property
+    def average_rate(self):
+        return self.tax / self.total_income if self.total_income else 0.0
+
+    def effective_rate_bins(self):
+        # {bin start in %: rows}, ready for st.bar_chart
+        return dict(zip((EFFECTIVE_RATE_EDGES[:-1] * 100).round(1).tolist(), self.effective_rate.tolist()))
+
+    def savings_bins(self):
+        # {bin start in ₹: rows}; positive means the New Tax Regime costs less
+        return dict(zip(SAVINGS_EDGES[:-1].tolist(), self.savings.tolist()))
+
+    def occupancy_table(self):
+        # Rows per slab rate, one column per regime
+        rates = sorted({rate for _, rate in self.occupancy})
+        table = {'Slab Rate': [f'{rate:.0%}' for rate in rates]}
+        for regime in (OLD_REGIME, NEW_REGIME):
+            table[REGIME_LABELS[regime]] = [self.occupancy.get((regime, rate), 0) for rate in rates]
+        return table
+
+
+def summarise_file(segment, path, year=None, chunksize=DEFAULT_CHUNKSIZE):
+    # Summary of a cohort CSV or Parquet input file, read chunk by chunk
+    if segment not in CALCULATE_TAX_ARGS:
+        raise ValueError(f'Unknown segment: {segment}')
+    columns = [name for name in input_columns(path) if name in CALCULATE_TAX_ARGS[segment]]
+    summary = CohortSummary(segment, year)
+    for frame in read_chunks(path, columns, chunksize):
+        summary.add({name: frame[name].to_numpy() for name in columns})
+    return summary
+
+
+def summarise_table(segment, table, year=None):
+    # Summary of results already computed, as an Arrow table of calculate_tax
+    # results with age and the regime labels alongside (e.g. a ResultSet's)
+    summary = CohortSummary(segment, year)
+    if table.num_rows:
+        names = [name for name in table.column_names if name in ('age', *LABEL_DEFAULTS, *RESULT_FIELDS)]
+        columns = {name: table.column(name).to_numpy() for name in names}
+        summary.add_results(columns, columns)
+    return summary
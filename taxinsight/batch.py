@@ -0,0 +1,193 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from taxinsight.paise import calculate_tax_exact
+from taxinsight.rules import DEFAULT_YEAR, available_years, get_rules
+from taxinsight.segments import CALCULATE_TAX_ARGS, RESULT_FIELDS, SEGMENTS, calculate_tax_columns
+
+DEFAULT_CHUNKSIZE = 100000
+
+
+def is_parquet(path):
+    return str(path).lower().endswith(('.parquet', '.pq'))
+
+
+def input_columns(path):
+    if is_parquet(path):
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_chunks(path, columns, chunksize=DEFAULT_CHUNKSIZE):
+    # Only the mapped columns are read, one chunk at a time
+    if is_parquet(path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=list(columns)):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=list(columns), chunksize=chunksize)
+
+
+class ResultWriter:
+    # Appends result chunks to a CSV or Parquet file as they are produced
+    def __init__(self, path, columns=RESULT_FIELDS):
+        self.path = path
+        self.columns = columns
+        self.parquet = is_parquet(path)
+        self.writer = None
+        self.rows = 0
+
+    def write(self, frame):
+        if self.parquet:
+            if self.writer is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(frame, schema=self.writer.schema, preserve_index=False)
+            self.writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        if self.rows == 0 and self.writer is None:
+            # Nothing was written; leave a file with just the result columns
+            self.write(pd.DataFrame({name: pd.Series(dtype='float64') for name in self.columns}).assign(error=pd.Series(dtype='object')))
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def resolve_mapping(segment, available, mapping=None):
+    # Map calculate_tax argument names to input columns; unmapped arguments
+    # are looked up under their own name and skipped when absent
+    mapping = dict(mapping or {})
+    unknown = set(mapping) - set(CALCULATE_TAX_ARGS[segment])
+    if unknown:
+        raise ValueError(f'Unknown {segment} argument(s) in mapping: {", ".join(sorted(unknown))}')
+    resolved = {}
+    for name in CALCULATE_TAX_ARGS[segment]:
+        column = mapping.get(name, name)
+        if column in available:
+            resolved[name] = column
+        elif name in mapping:
+            raise ValueError(f'Column not found in input: {column}')
+    return resolved
+
+
+def compute_chunk(segment, frame, mapping, keep=(), year=None, exact=False):
+    columns = {name: frame[column].to_numpy() for name, column in mapping.items()}
+    if exact:
+        results = calculate_tax_exact(segment, columns, year)
+    else:
+        results = calculate_tax_columns(segment, columns, year)
+    output = {column: frame[column].to_numpy() for column in keep}
+    output.update(results)
+    return pd.DataFrame(output, index=frame.index)
+
+
+def run_shard(shard, segment, frame, mapping, keep=(), year=None, exact=False):
+    # Compute one chunk and report its throughput; row-level validation
+    # errors end up in the result's error column instead of raising
+    started = time.perf_counter()
+    result = compute_chunk(segment, frame, mapping, keep, year, exact)
+    seconds = time.perf_counter() - started
+    stats = {
+        'shard': shard,
+        'pid': os.getpid(),
+        'rows': len(result),
+        'errors': int((result['error'] != '').sum()),
+        'seconds': seconds,
+        'rows_per_second': len(result) / seconds if seconds else 0.0,
+    }
+    return result, stats
+
+
+def run_batch(segment, input_path, output_path, mapping=None, keep=(), chunksize=DEFAULT_CHUNKSIZE, workers=1, on_shard=None, year=None, exact=False):
+    if segment not in SEGMENTS:
+        raise ValueError(f'Unknown segment: {segment}')
+    # Compile the rules up front so forked workers share them
+    year = get_rules(year).year
+    available = input_columns(input_path)
+    resolved = resolve_mapping(segment, available, mapping)
+    missing_keep = [column for column in keep if column not in available]
+    if missing_keep:
+        raise ValueError(f'Column not found in input: {", ".join(missing_keep)}')
+
+    # Each input column is read once even if it is both mapped and kept
+    columns = list(dict.fromkeys(list(keep) + list(resolved.values())))
+    frames = read_chunks(input_path, columns, chunksize)
+    if workers == 1:
+        shards = (run_shard(shard, segment, frame, resolved, keep, year, exact) for shard, frame in enumerate(frames))
+    else:
+        from taxinsight.parallel import map_shards
+        shards = map_shards(segment, frames, resolved, keep, workers, year, exact)
+
+    started = time.perf_counter()
+    rows = errors = 0
+    shard_stats = []
+    with ResultWriter(output_path) as writer:
+        for result, stats in shards:
+            writer.write(result)
+            rows += stats['rows']
+            errors += stats['errors']
+            shard_stats.append(stats)
+            if on_shard is not None:
+                on_shard(stats)
+    seconds = time.perf_counter() - started
+    return {'year': year, 'rows': rows, 'errors': errors, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0, 'shards': shard_stats}
+
+
+def parse_mapping(pairs):
+    mapping = {}
+    for pair in pairs or ():
+        name, sep, column = pair.partition('=')
+        if not sep or not name or not column:
+            raise argparse.ArgumentTypeError(f'Expected ARGUMENT=COLUMN, got {pair!r}')
+        mapping[name] = column
+    return mapping
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m taxinsight.batch', description='Compute taxes for a CSV or Parquet file of taxpayers.')
+    parser.add_argument('segment', choices=SEGMENTS, help='calculator to apply to every row')
+    parser.add_argument('input', help='input .csv or .parquet file')
+    parser.add_argument('output', help='output .csv or .parquet file')
+    parser.add_argument('--map', dest='mapping', action='append', metavar='ARGUMENT=COLUMN', help='read a calculate_tax argument from a differently named column (repeatable)')
+    parser.add_argument('--keep', action='append', default=[], metavar='COLUMN', help='copy an input column, such as an employee id, to the output (repeatable)')
+    parser.add_argument('--year', choices=available_years(), default=DEFAULT_YEAR, help='assessment year whose rules apply (default: %(default)s)')
+    parser.add_argument('--exact', action='store_true', help='compute in integer paise and round income and tax to the nearest ₹10 (sections 288A/288B)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per chunk (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes; 0 uses one per available CPU (default: %(default)s)')
+    parser.add_argument('--verbose', action='store_true', help='report the throughput of every chunk')
+    return parser
+
+
+def print_shard(stats):
+    print(f"Chunk {stats['shard']}: {stats['rows']} rows ({stats['errors']} with errors) in {stats['seconds']:.3f}s, {stats['rows_per_second']:.0f} rows/s [pid {stats['pid']}]", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    on_shard = print_shard if args.verbose else None
+    try:
+        summary = run_batch(args.segment, args.input, args.output, parse_mapping(args.mapping), args.keep, args.chunksize, args.workers, on_shard, args.year, args.exact)
+    except (ValueError, argparse.ArgumentTypeError, FileNotFoundError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    print(f"Processed {summary['rows']} rows for AY {summary['year']} ({summary['errors']} with errors) in {summary['seconds']:.2f}s, {summary['rows_per_second']:.0f} rows/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import inspect
+import io
+import os
+
+import streamlit as st
+
+from taxinsight.memo import memoize
+
+# 'matplotlib' renders cached PNGs; 'native' hands the data to Streamlit's
+# browser-side charts and skips Matplotlib altogether
+CHART_MODE = os.environ.get('TAXINSIGHT_CHARTS', 'matplotlib')
+
+# Same output resolution st.pyplot uses
+CHART_DPI = 200
+
+TAX_LABELS = ('Total Income', 'Deductions', 'Taxable Income', 'Tax Payable')
+
+
+def full_width_image():
+    # st.image arguments that stretch a chart to the column. Streamlit 1.37
+    # only knows use_column_width, 1.40 replaced it with use_container_width,
+    # and later releases deprecate both in favour of width='stretch'.
+    parameters = inspect.signature(st.image).parameters
+    if isinstance(parameters['width'].default, str):
+        return {'width': 'stretch'}
+    if 'use_container_width' in parameters:
+        return {'use_container_width': True}
+    return {'use_column_width': True}
+
+
+IMAGE_WIDTH = full_width_image()
+
+
+def figure_png(fig):
+    # Figures are created without pyplot, so nothing keeps them alive once
+    # they are saved; clearing them releases their artists straight away
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=CHART_DPI, bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+@memoize(maxsize=256, persist=True)
+def income_pie_png(labels, values):
+    # Matplotlib is only imported once the first chart is drawn
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    wedges, texts, autotexts = ax.pie(values, autopct='', startangle=140)
+    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+    percentages = [f'{value/sum(values)*100:.1f}%' for value in values]
+    legend_labels = [f'{label}: {pct}' for label, pct in zip(labels, percentages)]
+    ax.legend(wedges, legend_labels, title="Income Types", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
+    return figure_png(fig)
+
+
+@memoize(maxsize=256, persist=True)
+def tax_bar_png(labels, values):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar(labels, values)
+    ax.set_ylabel('Amount (₹)')
+    ax.set_title('Tax Breakdown')
+    ax.tick_params(axis='x', labelrotation=45)  # Rotate x-axis labels
+    return figure_png(fig)
+
+
+def income_breakdown(labels, values, mode=None):
+    labels, values = tuple(labels), tuple(values)
+    if (mode or CHART_MODE) == 'native':
+        st.vega_lite_chart({
+            'data': {'values': [{'Income Type': label, 'Amount': value} for label, value in zip(labels, values)]},
+            'mark': {'type': 'arc'},
+            'encoding': {
+                'theta': {'field': 'Amount', 'type': 'quantitative', 'stack': 'normalize'},
+                'color': {'field': 'Income Type', 'type': 'nominal', 'sort': None},
+                'tooltip': [{'field': 'Income Type'}, {'field': 'Amount', 'format': ',.2f'}],
+            },
+        }, use_container_width=True)
+    else:
+        st.image(income_pie_png(labels, values), **IMAGE_WIDTH)
+
+
+def tax_breakdown(values, mode=None):
+    values = tuple(values)
+    if (mode or CHART_MODE) == 'native':
+        st.bar_chart({'Amount (₹)': dict(zip(TAX_LABELS, values))})
+    else:
+        st.image(tax_bar_png(TAX_LABELS, values), **IMAGE_WIDTH)
+
+
+def cohort_dashboard(summary):
+    # Charts for a taxinsight.analytics.CohortSummary. Only its bins are sent
+    # to the browser, however many rows the cohort has.
+    valid = summary.rows - summary.errors
+    first, second, third = st.columns(3)
+    first.metric('Tax with cess', f'₹{summary.tax:,.0f}')
+    second.metric('Cess collected', f'₹{summary.cess:,.0f}')
+    third.metric('Average effective rate', f'{summary.average_rate:.1%}')
+    st.caption(f'{valid:,} of {summary.rows:,} rows computed; the rest have errors.')
+
+    st.subheader('Effective Tax Rate')
+    st.bar_chart({'Rows': summary.effective_rate_bins()})
+    st.caption('Tax with cess as a share of total income, in 0.5% bins.')
+
+    st.subheader('Slab Occupancy')
+    st.table(summary.occupancy_table())
+
+    st.subheader('Old vs New Regime Savings')
+    st.bar_chart({'Rows': summary.savings_bins()})
+    if summary.compared:
+        st.caption(f'Old minus New Tax Regime tax in ₹5,000 bins; the end bins include everything beyond them. {summary.new_better / summary.compared:.1%} of the cohort pays less under the New Tax Regime.')
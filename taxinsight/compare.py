@@ -0,0 +1,107 @@
+import numpy as np
+
+from taxinsight.rules import get_rules
+from taxinsight.segments import NEW_REGIME_DEDUCTIONS, SEGMENTS
+from taxinsight.slabs import NEW_REGIME, OLD_REGIME
+
+# Salary far beyond any slab boundary, used to find where the schedules finally diverge
+FAR_SALARY = 1e13
+
+
+def slab_segment(segment, residential_status='Resident'):
+    if segment not in SEGMENTS:
+        raise ValueError(f'Unknown segment: {segment}')
+    if segment == 'salaried' and residential_status != 'Resident':
+        return 'nri'
+    return segment
+
+
+def regime_tables(segment, age, residential_status='Resident', year=None):
+    rules = get_rules(year)
+    name = slab_segment(segment, residential_status)
+    return rules.table(name, OLD_REGIME, age), rules.table(name, NEW_REGIME, age), 1 + rules.cess_rate
+
+
+def sweep(segment, salary, deduction_80c=0, deduction_80d=0, deduction_80g=0, other_income=0, age=30, residential_status='Resident', year=None):
+    # Tax with cess under both regimes for every salary x 80C x 80D combination,
+    # in one vectorized pass. For business and senior profiles `salary` is the
+    # business or pension income, and other_income covers every other head.
+    # Combinations the calculator would reject (negative taxable income) are NaN.
+    old, new, cess = regime_tables(segment, age, residential_status, year)
+    salary = np.asarray(salary, dtype=np.float64).reshape(-1, 1, 1)
+    deductions = np.add.outer(np.atleast_1d(np.asarray(deduction_80c, dtype=np.float64)), np.atleast_1d(np.asarray(deduction_80d, dtype=np.float64)))
+    deductions = (deductions + deduction_80g)[np.newaxis]
+
+    income = salary + other_income
+    taxable_old = income - deductions
+    taxable_new = taxable_old if NEW_REGIME_DEDUCTIONS[segment] else np.broadcast_to(income, taxable_old.shape)
+    invalid = taxable_old < 0
+
+    old_tax = old.tax(taxable_old)
+    old_tax *= cess
+    new_tax = new.tax(taxable_new)
+    new_tax *= cess
+    old_tax[invalid] = np.nan
+    new_tax[invalid] = np.nan
+    return {
+        'old_tax': old_tax,
+        'new_tax': new_tax,
+        'savings': old_tax - new_tax,  # positive where the New Tax Regime is cheaper
+        'new_better': new_tax < old_tax,
+        'break_even': break_even(segment, deductions[0], other_income, age, residential_status, year),
+    }
+
+
+def break_even(segment, deductions=0, other_income=0, age=30, residential_status='Resident', year=None):
+    # Salary above which the regime that wins at high incomes stays strictly
+    # better, for each total deduction amount; NaN where neither regime ever
+    # wins outright. Both taxes are piecewise linear in salary, so the exact
+    # crossing lies between two consecutive slab boundaries.
+    old, new, cess = regime_tables(segment, age, residential_status, year)
+    deductions = np.asarray(deductions, dtype=np.float64)
+    new_deductions = deductions if NEW_REGIME_DEDUCTIONS[segment] else np.zeros_like(deductions)
+
+    # Salaries where either schedule changes slope, plus 0 and a far point
+    d = deductions[..., np.newaxis]
+    nd = new_deductions[..., np.newaxis]
+    shape = deductions.shape
+    points = np.concatenate([
+        np.broadcast_to(old.lower + d - other_income, shape + old.lower.shape),
+        np.broadcast_to(new.lower + nd - other_income, shape + new.lower.shape),
+        np.zeros(shape + (1,)),
+        np.full(shape + (1,), FAR_SALARY),
+    ], axis=-1)
+    points = np.sort(np.maximum(points, 0), axis=-1)
+
+    income = points + other_income
+    diff = (old.tax(np.maximum(income - d, 0)) - new.tax(np.maximum(income - nd, 0))) * cess
+    sign = np.sign(diff)
+    final = sign[..., -1:]
+
+    # Last point that does not already favour the final winner
+    differs = sign != final
+    last = differs.shape[-1] - 1 - np.argmax(differs[..., ::-1], axis=-1)[..., np.newaxis]
+    found = differs.any(axis=-1) & (final[..., 0] != 0)
+    last = np.minimum(last, differs.shape[-1] - 2)
+
+    x0 = np.take_along_axis(points, last, axis=-1)[..., 0]
+    x1 = np.take_along_axis(points, last + 1, axis=-1)[..., 0]
+    f0 = np.take_along_axis(diff, last, axis=-1)[..., 0]
+    f1 = np.take_along_axis(diff, last + 1, axis=-1)[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing = np.where(f0 == 0, x0, x0 + f0 * (x1 - x0) / (f0 - f1))
+    return np.where(found, crossing, np.nan)
+
+
+def compare_regimes(segment, salary, deductions=0, other_income=0, age=30, residential_status='Resident', year=None):
+    # Both regimes for a single profile, as the page would show them
+    result = sweep(segment, [salary], deductions, 0, 0, other_income, age, residential_status, year)
+    old_tax = float(result['old_tax'][0, 0, 0])
+    new_tax = float(result['new_tax'][0, 0, 0])
+    return {
+        'old_tax': old_tax,
+        'new_tax': new_tax,
+        'optimal': 'New Tax Regime' if new_tax < old_tax else 'Old Tax Regime',
+        'savings': abs(old_tax - new_tax),
+        'break_even': float(result['break_even'][0, 0]),
+    }
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from types import CodeType, ModuleType
+
+# Set TAXINSIGHT_DISK_CACHE to a file path to share results between
+# processes and restarts; every replica pointing at the same file shares them
+DISK_CACHE_PATH = os.environ.get('TAXINSIGHT_DISK_CACHE', '')
+DISK_CACHE_MAX_BYTES = int(float(os.environ.get('TAXINSIGHT_DISK_CACHE_MAX_MB', '256')) * 1024 * 1024)
+
+# A hit only rewrites its access time when the stored one is older than this,
+# so warm reads stay read-only
+ACCESS_RESOLUTION = 60.0
+
+# Size is checked for eviction once every this many writes
+EVICTION_INTERVAL = 64
+
+# Modules under this directory count towards a cached function's version
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+'''
+
+
+class DiskCache:
+    # Pickled values in a SQLite file in WAL mode: readers never block, and
+    # several processes can read and write the same file. Least recently
+    # used entries are evicted once the values exceed max_bytes. Database
+    # errors count as misses, so a busy or broken cache only costs speed.
+    def __init__(self, path, max_bytes=DISK_CACHE_MAX_BYTES):
+        if max_bytes < 1:
+            raise ValueError('max_bytes must be at least 1.')
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = self.misses = self.evictions = self.errors = 0
+        with self.connection() as db:
+            db.executescript(SCHEMA)
+
+    def connection(self):
+        # SQLite connections may not be shared between threads, nor with
+        # processes forked after they were opened
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, key, default=None):
+        try:
+            db = self.connection()
+            row = db.execute('SELECT value, accessed FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            now = time.time()
+            if now - row[1] > ACCESS_RESOLUTION:
+                db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            value = pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError):
+            self.errors += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            db = self.connection()
+            db.execute('INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)', (key, blob, len(blob), time.time()))
+            with self._lock:
+                self._writes += 1
+                due = self._writes % EVICTION_INTERVAL == 0
+            if due:
+                self.evict()
+        except (sqlite3.Error, pickle.PicklingError, TypeError):
+            self.errors += 1
+
+    def evict(self):
+        # Drop the least recently used entries until the values fit again
+        db = self.connection()
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        removed = 0
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for key, size in db.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall():
+                if excess <= 0:
+                    break
+                db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                excess -= size
+                removed += 1
+            db.execute('COMMIT')
+        except sqlite3.Error:
+            db.execute('ROLLBACK')
+            raise
+        self.evictions += removed
+
+    def clear(self):
+        try:
+            self.connection().execute('DELETE FROM entries')
+        except sqlite3.Error:
+            self.errors += 1
+        self.hits = self.misses = self.evictions = self.errors = 0
+
+    def stats(self):
+        try:
+            size, total = self.connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        except sqlite3.Error:
+            size = total = None
+        return {
+            'path': self.path,
+            'size': size,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'errors': self.errors,
+        }
+
+
+def stable_key(name, args, kwargs, version):
+    # Same arguments, same key in every process; unlike hash() it is not
+    # salted per process. Arguments are plain numbers and strings, whose
+    # repr is stable.
+    text = repr((name, version, args, sorted(kwargs.items())))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def code_version(func):
+    # Changes when the function's body changes, or the source of its module
+    # or of any module of this app it draws on, so a deploy with new code
+    # (e.g. a changed slab helper) does not serve results computed by the
+    # old one. The rules in force are keyed separately by rules_fingerprint.
+    digest = hashlib.sha256()
+
+    def add(code):
+        digest.update(code.co_code)
+        for const in code.co_consts:
+            if isinstance(const, CodeType):
+                add(const)  # nested functions; their repr holds an address
+            else:
+                digest.update(repr(const).encode())
+
+    add(func.__code__)
+    digest.update(source_version(func.__module__).encode())
+    return digest.hexdigest()[:16]
+
+
+def source_version(module_name):
+    # Hash of a module's source and of every module under SOURCE_ROOT it
+    # imports from, directly or through other such modules
+    sources = {}
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        module = sys.modules.get(name)
+        path = getattr(module, '__file__', None)
+        if name in sources or not path or not os.path.abspath(path).startswith(SOURCE_ROOT + os.sep):
+            continue
+        with open(path, 'rb') as f:
+            sources[name] = f.read()
+        for value in vars(module).values():
+            name = value.__name__ if isinstance(value, ModuleType) else getattr(value, '__module__', None)
+            if isinstance(name, str):
+                pending.append(name)
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        digest.update(name.encode())
+        digest.update(sources[name])
+    return digest.hexdigest()
+
+
+_disk = None
+_disk_lock = threading.Lock()
+
+
+def get_disk_cache():
+    # The shared cache, or None when TAXINSIGHT_DISK_CACHE is not set
+    global _disk
+    if not DISK_CACHE_PATH:
+        return None
+    if _disk is None:
+        with _disk_lock:
+            if _disk is None:
+                _disk = DiskCache(DISK_CACHE_PATH)
+    return _disk
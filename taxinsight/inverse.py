@@ -0,0 +1,83 @@
+import numpy as np
+
+from taxinsight.rules import get_rules
+from taxinsight.segments import (
+    LABEL_DEFAULTS,
+    NEGATIVE_TAXABLE_ERROR,
+    NEGATIVE_VALUES_ERROR,
+    NEW_REGIME_DEDUCTIONS,
+    SEGMENTS,
+    label_columns,
+    table_groups,
+)
+from taxinsight.slabs import NEW_REGIME
+
+OTHER_INCOME_ERROR = 'Income from other heads already exceeds the target.'
+
+INVERSE_FIELDS = ('income', 'total_income', 'tax')
+
+
+def gross_up(segment, target, tax_regime=LABEL_DEFAULTS['tax_regime'], age=30, residential_status=LABEL_DEFAULTS['residential_status'], other_income=0, deductions=0, year=None):
+    # The salary (business or pension income for those segments) whose total
+    # income minus tax and cess equals `target`. Every argument may be an
+    # array; results have their broadcast shape, with NaN and an error
+    # message where no income the calculator accepts reaches the target.
+    #
+    # With cess, net income is I - (1 + cess) * T(I - d), which is increasing
+    # and linear between slab boundaries (no rate reaches 1 / (1 + cess)). The
+    # net income at each boundary is precomputed per table, so each target is
+    # one search plus one division.
+    if segment not in SEGMENTS:
+        raise ValueError(f'Unknown segment: {segment}')
+    rules = get_rules(year)
+    arrays = np.broadcast_arrays(
+        np.asarray(target, dtype=np.float64),
+        np.asarray(age, dtype=np.float64),
+        np.asarray(other_income, dtype=np.float64),
+        np.asarray(deductions, dtype=np.float64),
+        np.asarray(tax_regime, dtype=object),
+        np.asarray(residential_status, dtype=object),
+    )
+    shape = arrays[0].shape
+    target, age, other_income, deductions, tax_regime, residential_status = (array.ravel() for array in arrays)
+    size = target.size
+
+    columns = {'tax_regime': tax_regime, 'residential_status': residential_status}
+    cess = 1 + rules.cess_rate
+    total_income = np.full(size, np.nan)
+    deductions = deductions.copy()
+    for table, regime, mask in table_groups(segment, label_columns(segment, columns, size), age, rules):
+        if regime == NEW_REGIME and not NEW_REGIME_DEDUCTIONS[segment]:
+            deductions[mask] = 0.0
+        d = deductions[mask]
+        # Net income at each slab's lower bound, less the deductions
+        base = table.lower - cess * table.cumulative
+        net = target[mask]
+        k = np.maximum(np.searchsorted(base, net - d, side='right') - 1, 0)
+        total_income[mask] = (net + cess * (table.intercepts[k] - table.rates[k] * d)) / (1 - cess * table.rates[k])
+
+    income = total_income - other_income
+    error = np.full(size, '', dtype=object)
+    error[income < 0] = OTHER_INCOME_ERROR
+    error[total_income < deductions] = NEGATIVE_TAXABLE_ERROR
+    error[~((target >= 0) & (age >= 0) & (other_income >= 0) & (deductions >= 0))] = NEGATIVE_VALUES_ERROR
+    invalid = error != ''
+    income[invalid] = np.nan
+    total_income[invalid] = np.nan
+
+    results = {
+        'income': income,
+        'total_income': total_income,
+        'tax': total_income - target,
+    }
+    results = {name: column.reshape(shape) for name, column in results.items()}
+    results['error'] = error.reshape(shape)
+    return results
+
+
+def gross_up_income(segment, target, tax_regime=LABEL_DEFAULTS['tax_regime'], age=30, residential_status=LABEL_DEFAULTS['residential_status'], other_income=0, deductions=0, year=None):
+    # Single-target version; raises ValueError where the calculator would reject the income
+    result = gross_up(segment, target, tax_regime, age, residential_status, other_income, deductions, year)
+    if result['error'].item():
+        raise ValueError(result['error'].item())
+    return float(result['income'])
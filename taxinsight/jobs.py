@@ -0,0 +1,279 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from taxinsight.analytics import CohortSummary, summarise_table
+from taxinsight.batch import input_columns, run_batch
+from taxinsight.resultset import ResultSet
+from taxinsight.segments import CALCULATE_TAX_ARGS, REQUIRED_FIELDS
+
+# Uploaded cohorts and their results are kept here while the job is listed
+JOBS_DIR = os.environ.get('TAXINSIGHT_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'taxinsight-jobs'))
+JOB_WORKERS = int(os.environ.get('TAXINSIGHT_JOB_WORKERS', '1'))
+JOB_CHUNKSIZE = 10000
+
+# Finished jobs no session has looked at for this many seconds are removed
+# with their files
+JOB_TTL = float(os.environ.get('TAXINSIGHT_JOB_TTL', '3600'))
+
+# Seconds between progress refreshes while a job runs
+POLL_INTERVAL = 1.0
+
+# Copied to the results so they can be indexed by regime and slab
+INDEX_INPUTS = ('age', 'tax_regime', 'residential_status')
+
+# Rows of the filtered results drawn in the table; the download has them all
+PREVIEW_ROWS = 10000
+
+RUNNING, DONE, CANCELLED, FAILED = 'running', 'done', 'cancelled', 'failed'
+
+
+class Cancelled(Exception):
+    pass
+
+
+class BatchJob:
+    # A cohort file computed by run_batch on a background thread. The thread
+    # only writes the progress counters; the page reads them on each rerun.
+    def __init__(self, segment, input_path, output_path, year=None):
+        self.id = uuid.uuid4().hex
+        self.segment = segment
+        self.input_path = input_path
+        self.output_path = output_path
+        self.results_path = os.path.splitext(output_path)[0] + '.arrow'
+        self.year = year
+        self.status = RUNNING
+        self.message = ''
+        self.rows = self.errors = 0
+        self.total = None
+        self.flushed = (0, 0)  # rows and bytes of output written by finished chunks
+        self.summary = None
+        self.started = time.monotonic()
+        self.finished = None
+        self.seen = self.started  # last time a page showed the job
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self.run, name=f'taxinsight-job-{self.id[:8]}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.total = count_records(self.input_path)
+            status = DONE
+            try:
+                run_batch(self.segment, self.input_path, self.output_path, keep=self.index_columns(), chunksize=JOB_CHUNKSIZE, workers=JOB_WORKERS, on_shard=self.progress, year=self.year)
+            except Cancelled:
+                status = CANCELLED
+            # Index whatever was written, so the page can filter it without a
+            # scan, and summarise the same results rather than recompute them
+            if self.rows:
+                results = ResultSet.read_batch(self.segment, self.output_path, self.year)
+                results.write_ipc(self.results_path)
+                if status == DONE:
+                    self.summary = summarise_table(self.segment, results.table, self.year)
+            elif status == DONE:
+                self.summary = CohortSummary(self.segment, self.year)
+            self.status = status
+        except (ValueError, OSError) as e:
+            self.status = FAILED
+            self.message = str(e)
+        except Exception as e:
+            self.status = FAILED
+            self.message = f'Unexpected error: {e}'
+        finally:
+            self.finished = time.monotonic()
+
+    def index_columns(self):
+        # Input columns the result set needs to tell regimes and slab tables apart
+        available = input_columns(self.input_path)
+        return [name for name in INDEX_INPUTS if name in available and name in CALCULATE_TAX_ARGS[self.segment]]
+
+    def progress(self, stats):
+        # Called after every chunk is written; raising stops run_batch there
+        self.rows += stats['rows']
+        self.errors += stats['errors']
+        self.flushed = (self.rows, os.path.getsize(self.output_path))
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def partial_output(self):
+        # The output up to the end of the last finished chunk, while later
+        # chunks may still be appended to it
+        rows, size = self.flushed
+        with open(self.output_path, 'rb') as f:
+            return rows, f.read(size)
+
+    @property
+    def running(self):
+        return self.status == RUNNING
+
+    @property
+    def fraction(self):
+        if self.status == DONE:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.rows / self.total, 1.0)
+
+    @property
+    def rows_per_second(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def remove_files(self):
+        for path in (self.input_path, self.output_path, self.results_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def count_records(path):
+    # Data rows as pandas reads them: quoted fields may span lines, and blank
+    # lines are skipped
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        return max(sum(1 for row in csv.reader(f) if row) - 1, 0)
+
+
+# Jobs of every session in this process, oldest first
+JOBS = {}
+_lock = threading.Lock()
+
+
+def start_job(segment, data, year=None, replaces=None):
+    # Save an uploaded CSV and start computing it in the background.
+    # `replaces` is the job the session showed before, which only it
+    # refers to, so it is removed at once if finished.
+    if segment not in CALCULATE_TAX_ARGS:
+        raise ValueError(f'Unknown segment: {segment}')
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    name = uuid.uuid4().hex
+    input_path = os.path.join(JOBS_DIR, f'{name}-input.csv')
+    with open(input_path, 'wb') as f:
+        f.write(data)
+    job = BatchJob(segment, input_path, os.path.join(JOBS_DIR, f'{name}-results.csv'), year)
+    with _lock:
+        JOBS[job.id] = job
+        if replaces is not None and not replaces.running:
+            forget(replaces)
+        # Jobs of other sessions are only removed once none has shown them
+        # for JOB_TTL, e.g. after their browser tab was closed
+        now = time.monotonic()
+        for old in [old for old in JOBS.values() if not old.running and now - old.seen > JOB_TTL]:
+            forget(old)
+    return job.start()
+
+
+def forget(job):
+    # Caller holds _lock
+    if JOBS.pop(job.id, None) is not None:
+        job.remove_files()
+
+
+def get_job(job_id):
+    job = JOBS.get(job_id)
+    if job is not None:
+        job.seen = time.monotonic()
+    return job
+
+
+def cohort_app(segment):
+    # "Upload cohort" mode of a calculator page. The script run never waits
+    # for the job: while it runs, only the progress fragment reruns.
+    import streamlit as st
+
+    key = f'cohort_job_{segment}'
+    st.title('Upload Cohort')
+    st.write('Upload a CSV with one row per person to calculate everyone\'s tax in the background.')
+    st.caption(f"Columns: {', '.join(CALCULATE_TAX_ARGS[segment])}. Required: {', '.join(REQUIRED_FIELDS[segment])}; missing values default to the calculator's defaults.")
+
+    job = get_job(st.session_state.get(key))
+    upload = st.file_uploader('Cohort CSV', type=['csv'], key=f'{key}_upload')
+    if st.button('Start', disabled=upload is None or (job is not None and job.running)):
+        if job is not None:
+            st.session_state.pop(download_key(job), None)
+        job = start_job(segment, upload.getvalue(), st.session_state.get('assessment_year'), replaces=job)
+        st.session_state[key] = job.id
+
+    if job is None:
+        return
+    if job.running:
+        st.fragment(show_progress, run_every=POLL_INTERVAL)(job, live=True)
+        return
+    st.session_state.pop(partial_key(job), None)
+    show_progress(job)
+
+    if job.status == FAILED:
+        st.error(f'Error: {job.message}')
+    else:
+        if job.status == CANCELLED:
+            st.warning('Cancelled; the results below cover the rows computed before that.')
+        if os.path.exists(job.output_path):
+            # Read only when asked for, not on every rerun of the page
+            key = download_key(job)
+            if key not in st.session_state and st.button('Prepare download of the results'):
+                with open(job.output_path, 'rb') as f:
+                    st.session_state[key] = f.read()
+            if key in st.session_state:
+                st.download_button('Download results', st.session_state[key], file_name=f'{segment}-tax-results.csv', mime='text/csv')
+        if os.path.exists(job.results_path):
+            show_results(ResultSet.open_ipc(job.results_path), key)
+        if job.summary is not None:
+            from taxinsight import charts
+
+            st.header('Cohort Analytics')
+            charts.cohort_dashboard(job.summary)
+
+
+def show_progress(job, live=False):
+    import streamlit as st
+
+    st.progress(job.fraction)
+    total = f' of {job.total:,}' if job.total is not None else ''
+    st.write(f'{job.rows:,}{total} rows ({job.errors:,} with errors), {job.rows_per_second:,.0f} rows/s')
+    if job.running:
+        if st.button('Cancel'):
+            job.cancel()
+        # The file is read only when asked for, not on every progress refresh
+        key = partial_key(job)
+        if job.flushed[0] and st.button('Prepare download of the rows so far'):
+            st.session_state[key] = job.partial_output()
+        if key in st.session_state:
+            rows, data = st.session_state[key]
+            st.download_button(f'Download the first {rows:,} rows', data, file_name=f'{job.segment}-tax-results-partial.csv', mime='text/csv')
+    elif live:
+        # Finished since the page was drawn; redraw all of it with the results
+        st.rerun()
+
+
+def partial_key(job):
+    return f'cohort_partial_{job.id}'
+
+
+def download_key(job):
+    return f'cohort_download_{job.id}'
+
+
+def show_results(results, key):
+    # Filters run on the result set's index; the Arrow table goes to
+    # st.dataframe as is, without a round trip through pandas
+    import streamlit as st
+
+    counts = results.counts()
+    regimes = sorted({regime for _, regime, _ in counts})
+    brackets = sorted({bracket for _, _, bracket in counts})
+    regime = st.multiselect('Regime', regimes, default=regimes, key=f'{key}_regime')
+    bracket = st.multiselect('Tax slab', brackets, default=brackets, format_func=lambda b: 'Error' if b < 0 else f'Slab {b + 1}', key=f'{key}_bracket')
+    filtered = results.filter(regime=regime, bracket=bracket)
+    st.write(f'{len(filtered):,} of {len(results):,} rows')
+    st.dataframe(filtered.table.slice(0, PREVIEW_ROWS))
+    if len(filtered) > PREVIEW_ROWS:
+        st.caption(f'Showing the first {PREVIEW_ROWS:,} rows.')
@@ -0,0 +1,112 @@
+from taxinsight.memo import memoize
+from taxinsight.rules import get_rules
+from taxinsight.slabs import NEW_REGIME, OLD_REGIME
+
+REGIME_NAMES = {OLD_REGIME: 'Old Regime', NEW_REGIME: 'New Regime'}
+
+
+def rupees(amount):
+    return f'₹{amount:,.0f}'
+
+
+def percent(rate):
+    return f'{rate * 100:g}%'
+
+
+def merged_slabs(table):
+    # (lower bound, upper bound or None, rate), with neighbouring slabs at the
+    # same rate shown as one
+    slabs = []
+    for lower, rate in zip(table.lower.tolist(), table.rates.tolist()):
+        if slabs and slabs[-1][1] == rate:
+            continue
+        slabs.append((lower, rate))
+    uppers = [lower for lower, _ in slabs[1:]] + [None]
+    return [(lower, upper, rate) for (lower, rate), upper in zip(slabs, uppers)]
+
+
+@memoize(maxsize=64)
+def slab_section(segment, regime, age, income, year=None):
+    # Slab table and worked example for one calculator table, built from the
+    # compiled rules. Cached per assessment year, i.e. per rule version.
+    table = get_rules(year).table(segment, regime, age)
+    slabs = merged_slabs(table)
+    ranges = []
+    for lower, upper, _ in slabs:
+        if upper is None:
+            ranges.append(f'Above {rupees(lower)}')
+        else:
+            ranges.append(f'{rupees(lower + 1 if lower else 0)} to {rupees(upper)}')
+
+    lines = []
+    for lower, upper, rate in slabs:
+        if income <= lower:
+            break
+        portion = min(income, upper if upper is not None else income) - lower
+        lines.append(f'- {rupees(portion)} at {percent(rate)} = {rupees(portion * rate)}')
+    tax = table.tax(income)
+    lines.append(f'- Total Tax ({REGIME_NAMES[regime]}): {rupees(tax)}')
+    return {
+        'table': {'Range': ranges, 'Rate': [percent(rate) for _, _, rate in slabs]},
+        'example_title': f'Example Calculation for Taxable Income of {rupees(income)}:',
+        'example': '\n'.join(lines),
+        'tax': tax,
+    }
+
+
+@memoize(maxsize=64)
+def cess_example(segment, regime, age, income, year=None):
+    rules = get_rules(year)
+    tax = rules.table(segment, regime, age).tax(income)
+    cess = tax * rules.cess_rate
+    return (
+        f'- Total Tax ({REGIME_NAMES[regime]}): {rupees(tax)}\n'
+        f'- Health and Education Cess: {rupees(cess)} ({percent(rules.cess_rate)} of {rupees(tax)})\n'
+        f'- Total Tax after Cess: {rupees(tax + cess)}'
+    )
+
+
+@memoize(maxsize=64)
+def profile_example(segment, regime, age, incomes, deductions, tds=0, advance_tax=0, year=None):
+    # Income, deduction and tax paid figures of one example profile, taken
+    # through the calculator's rules. incomes and deductions are
+    # ((label, amount), ...) pairs in the order the page asks for them.
+    rules = get_rules(year)
+    total_income = sum(amount for _, amount in incomes)
+    total_deductions = sum(amount for _, amount in deductions)
+    taxable_income = total_income - total_deductions
+    tax = rules.table(segment, regime, age).tax(taxable_income)
+    tax += tax * rules.cess_rate
+    net_tax_payable = tax - tds - advance_tax
+    return {
+        'income': '\n'.join([f'- {label}: {rupees(amount)}' for label, amount in incomes] + [f'- Total Income: {rupees(total_income)}']),
+        'deductions': '\n'.join([f'- {label}: {rupees(amount)}' for label, amount in deductions] + [
+            f'- Total Deductions: {rupees(total_deductions)}',
+            f'- Taxable Income after Deductions: {rupees(taxable_income)}',
+        ]),
+        'tax_paid': '\n'.join([
+            f'- Total Tax after Cess ({REGIME_NAMES[regime]}): {rupees(tax)}',
+            f'- TDS: {rupees(tds)}',
+            f'- Advance Tax: {rupees(advance_tax)}',
+            f'- Net Tax Payable: {rupees(net_tax_payable)}' if net_tax_payable >= 0 else f'- Refund Due: {rupees(-net_tax_payable)}',
+        ]),
+    }
+
+
+def show_slab_section(heading, segment, regime, age, income, year=None):
+    import streamlit as st
+
+    section = slab_section(segment, regime, age, income, year)
+    st.markdown(heading)
+    st.table(section['table'])
+    st.write(section['example_title'])
+    st.write(section['example'])
+
+
+def show_cess_section(segment, regime, age, income, year=None):
+    import streamlit as st
+
+    st.markdown('### Health and Education Cess')
+    st.write(f'A {percent(get_rules(year).cess_rate)} cess is added to the calculated tax.')
+    st.write('Example:')
+    st.write(cess_example(segment, regime, age, income, year))
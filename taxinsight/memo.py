@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from taxinsight.diskcache import code_version, get_disk_cache, stable_key
+from taxinsight.tracing import span
+
+# Defaults can be tuned per deployment without touching the code
+DEFAULT_MAXSIZE = int(os.environ.get('TAXINSIGHT_CACHE_MAXSIZE', '4096'))
+DEFAULT_TTL = float(os.environ['TAXINSIGHT_CACHE_TTL']) if os.environ.get('TAXINSIGHT_CACHE_TTL') else None
+
+# TAXINSIGHT_NO_CACHE=1 bypasses every memo, e.g. when benchmarking
+_enabled = os.environ.get('TAXINSIGHT_NO_CACHE', '') in ('', '0')
+
+_MISSING = object()
+_KWARGS = object()
+
+# Every memo created by memoize(), by name
+CACHES = {}
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+class MemoCache:
+    # Thread-safe LRU map with an optional time-to-live per entry and
+    # hit/miss/eviction counters. Streamlit serves sessions from threads.
+    def __init__(self, name, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return _MISSING
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize=None, ttl=_MISSING):
+        with self._lock:
+            if maxsize is not None:
+                if maxsize < 1:
+                    raise ValueError('maxsize must be at least 1.')
+                self.maxsize = maxsize
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+            if ttl is not _MISSING:
+                self.ttl = ttl
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+def make_key(args, kwargs):
+    # Plain argument tuples hash far faster than pickling the arguments
+    if kwargs:
+        return args + (_KWARGS,) + tuple(sorted(kwargs.items()))
+    return args
+
+
+def memoize(maxsize=None, ttl=DEFAULT_TTL, name=None, persist=False):
+    # Drop-in replacement for @st.cache_data on the pure tax functions.
+    # Exceptions are not cached, and calls with unhashable arguments such as
+    # NumPy arrays run uncached. With persist=True, misses fall through to
+    # the on-disk cache shared by every process (see taxinsight.diskcache),
+    # keyed by the function's code and the tax rules in force.
+    def decorator(func):
+        cache = MemoCache(name or f'{func.__module__}.{func.__qualname__}', maxsize or DEFAULT_MAXSIZE, ttl)
+        CACHES[cache.name] = cache
+        lookup = f'cache lookup ({func.__qualname__})'
+        # Versioned on first use: while the decorator runs, the module's
+        # later imports and helpers do not exist yet
+        disk_name = []
+
+        def compute(args, kwargs):
+            disk = get_disk_cache() if persist else None
+            if disk is None:
+                return func(*args, **kwargs)
+            from taxinsight.rules import rules_fingerprint
+
+            if not disk_name:
+                disk_name.append(f'{cache.name}:{code_version(func)}')
+            key = stable_key(disk_name[0], args, kwargs, rules_fingerprint())
+            with span(f'disk cache ({func.__qualname__})'):
+                value = disk.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                disk.put(key, value)
+            return value
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            key = make_key(args, kwargs)
+            try:
+                with span(lookup):
+                    value = cache.get(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            if value is _MISSING:
+                value = compute(args, kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    disk = get_disk_cache()
+    if disk is not None:
+        stats['disk'] = disk.stats()
+    return stats
+
+
+def clear_caches():
+    # In-process memos only; the on-disk cache is shared with other processes
+    for cache in CACHES.values():
+        cache.clear()
@@ -0,0 +1,115 @@
+import numpy as np
+
+from taxinsight.rules import get_rules
+from taxinsight.segments import (
+    DEDUCTION_FIELDS,
+    INCOME_FIELDS,
+    NEGATIVE_VALUES_ERROR,
+    NEW_REGIME_DEDUCTIONS,
+    REQUIRED_FIELDS,
+    calculate_tax_columns,
+    label_columns,
+    table_groups,
+)
+from taxinsight.slabs import NEW_REGIME
+
+# Most each section can absorb, as capped by the page widgets; 80G has no cap there
+DEDUCTION_CAPS = {
+    'deduction_80c': 150000.0,
+    'deduction_80d': 25000.0,
+    'deduction_80g': float('inf'),
+}
+
+OPTIMIZER_FIELDS = ('deduction_80c', 'deduction_80d', 'deduction_80g', 'tax_saving', 'net_tax_payable', 'marginal_saving', 'unused_budget')
+
+
+def claimed_column(columns, name, size):
+    if name not in columns:
+        return np.zeros(size)
+    return np.broadcast_to(np.nan_to_num(np.asarray(columns[name], dtype=np.float64)), (size,))
+
+
+def optimize_columns(segment, columns, budget, year=None):
+    # Spend an extra investment budget on 80C, 80D and 80G so that
+    # net_tax_payable is as low as possible, for every row at once.
+    #
+    # Each section lowers taxable income rupee for rupee, and the slab tax is
+    # piecewise linear and non-decreasing, so the only question is how much to
+    # deduct: as much as the budget and the section caps allow, but no more
+    # than takes taxable income down to the tax-free limit. That amount is
+    # then filled into 80C, 80D and 80G in that order (80C investments are
+    # kept, 80G donations are not). The marginal saving is the tax saved by
+    # one more rupee of budget.
+    rules = get_rules(year)
+    results = calculate_tax_columns(segment, columns, year)
+    size = len(results['error'])
+    error = results['error'].copy()
+
+    budget = np.broadcast_to(np.asarray(budget, dtype=np.float64), (size,))
+    bad_budget = ~(budget >= 0)  # also catches NaN
+    error[bad_budget & (error == '')] = NEGATIVE_VALUES_ERROR
+    invalid = (error != '')
+    budget = np.where(bad_budget, 0.0, budget)
+
+    # Room left in each section after the deductions already claimed. The
+    # senior page only takes a total, which is counted against 80C, then 80D,
+    # then 80G, the order the budget fills them in.
+    total_claimed = claimed_column(columns, 'total_deductions', size) if 'total_deductions' in DEDUCTION_FIELDS[segment] else np.zeros(size)
+    headroom = {}
+    for name, cap in DEDUCTION_CAPS.items():
+        if name in DEDUCTION_FIELDS[segment]:
+            claimed = claimed_column(columns, name, size)
+        else:
+            claimed = np.minimum(total_claimed, cap)
+            total_claimed = total_claimed - claimed
+        headroom[name] = np.maximum(cap - claimed, 0.0)
+    room = headroom['deduction_80c'] + headroom['deduction_80d'] + headroom['deduction_80g']
+    spendable = np.minimum(budget, room)
+
+    taxable = np.where(invalid, 0.0, results['taxable_income'])
+    ages = np.nan_to_num(np.asarray(columns['age'], dtype=np.float64))
+    useful = np.zeros(size)
+    saving = np.zeros(size)
+    rate = np.zeros(size)
+    for table, regime, mask in table_groups(segment, label_columns(segment, columns, size), ages, rules):
+        if regime == NEW_REGIME and not NEW_REGIME_DEDUCTIONS[segment]:
+            continue  # deductions do not count here
+        income = taxable[mask]
+        amount = np.clip(income - table.free_limit, 0.0, spendable[mask])
+        useful[mask] = amount
+        saving[mask] = table.tax(income) - table.tax(income - amount)
+        rate[mask] = table.rate_below(income - amount)
+    cess = 1 + rules.cess_rate
+    saving *= cess
+    # An extra rupee only helps while the sections still have room
+    marginal = np.where(budget < room, rate * cess, 0.0)
+
+    allocation_80c = np.minimum(useful, headroom['deduction_80c'])
+    allocation_80d = np.minimum(useful - allocation_80c, headroom['deduction_80d'])
+    output = {
+        'deduction_80c': allocation_80c,
+        'deduction_80d': allocation_80d,
+        'deduction_80g': useful - allocation_80c - allocation_80d,
+        'tax_saving': saving,
+        'net_tax_payable': results['net_tax_payable'] - saving,
+        'marginal_saving': marginal,
+        'unused_budget': budget - useful,
+    }
+    for column in output.values():
+        column[invalid] = np.nan
+    output['error'] = error
+    return output
+
+
+def optimize_deductions(segment, budget, year=None, **profile):
+    # Single-profile version; raises ValueError where calculate_tax would
+    for name in REQUIRED_FIELDS[segment]:
+        if name not in profile:
+            raise ValueError(f'Missing required field: {name}')
+    columns = {name: np.array([value], dtype=object if isinstance(value, str) else np.float64) for name, value in profile.items()}
+    for name in INCOME_FIELDS[segment] + DEDUCTION_FIELDS[segment]:
+        columns.setdefault(name, np.zeros(1))
+    result = optimize_columns(segment, columns, budget, year)
+    if result['error'][0]:
+        raise ValueError(result['error'][0])
+    return {name: float(result[name][0]) for name in OPTIMIZER_FIELDS}
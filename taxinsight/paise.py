@@ -0,0 +1,201 @@
+import bisect
+
+import numpy as np
+
+from taxinsight.rules import get_rules
+from taxinsight.segments import (
+    CALCULATE_TAX_ARGS,
+    DEDUCTION_FIELDS,
+    INCOME_FIELDS,
+    MISSING_VALUE_ERROR,
+    NEGATIVE_TAXABLE_ERROR,
+    NEGATIVE_VALUES_ERROR,
+    REQUIRED_FIELDS,
+    label_columns,
+    numeric_fields,
+    table_groups,
+)
+from taxinsight.slabs import is_scalar
+
+# Amounts are integer paise and rates integer basis points, so every
+# intermediate value is exact; tax is accumulated in paise x basis points
+# and only divided back to paise when it is rounded.
+PAISE = 100
+BASIS_POINTS = 10000
+HALF_BASIS_POINTS = BASIS_POINTS // 2
+
+# Sections 288A and 288B: total income and tax payable are rounded to the
+# nearest multiple of ten rupees, a remainder of five rupees or more rounding up
+ROUNDING_PAISE = 10 * PAISE
+
+
+def to_paise(rupees):
+    if is_scalar(rupees):
+        return int(round(rupees * PAISE))
+    return np.rint(np.asarray(rupees, dtype=np.float64) * PAISE).astype(np.int64)
+
+
+def to_rupees(paise):
+    if is_scalar(paise):
+        return paise / PAISE
+    return np.asarray(paise) / PAISE
+
+
+def to_basis_points(rate):
+    points = round(rate * BASIS_POINTS)
+    if abs(points - rate * BASIS_POINTS) > 1e-6:
+        raise ValueError(f'Rate {rate} is not a whole number of basis points.')
+    return int(points)
+
+
+def divide_round(value, divisor):
+    # value / divisor rounded half away from zero, exactly
+    if is_scalar(value):
+        quotient = (abs(value) + divisor // 2) // divisor
+        return quotient if value >= 0 else -quotient
+    value = np.asarray(value, dtype=np.int64)
+    return np.sign(value) * ((np.abs(value) + divisor // 2) // divisor)
+
+
+def round_to_tens(paise):
+    return divide_round(paise, ROUNDING_PAISE) * ROUNDING_PAISE
+
+
+class PaiseTable:
+    # Integer twin of a SlabTable: tax in slab i is
+    # (intercepts[i] + income * rates[i]) / BASIS_POINTS, in paise. The
+    # intercepts carry half a basis point so that flooring rounds to nearest.
+    __slots__ = ('key', 'edges', 'rates', 'intercepts', '_edges', '_rates', '_intercepts')
+
+    def __init__(self, table):
+        lower = [to_paise(bound) for bound in table.lower.tolist()]
+        rates = [to_basis_points(rate) for rate in table.rates.tolist()]
+        intercepts = []
+        cumulative = 0
+        for i, (bound, rate) in enumerate(zip(lower, rates)):
+            if i:
+                cumulative += (bound - lower[i - 1]) * rates[i - 1]
+            intercepts.append(cumulative - bound * rate + HALF_BASIS_POINTS)
+
+        self.key = table.key
+        self._edges = tuple(lower[1:])
+        self._rates = tuple(rates)
+        self._intercepts = tuple(intercepts)
+        self.edges = np.array(self._edges, dtype=np.int64)
+        self.rates = np.array(self._rates, dtype=np.int64)
+        self.intercepts = np.array(self._intercepts, dtype=np.int64)
+        for array in (self.edges, self.rates, self.intercepts):
+            array.setflags(write=False)
+
+    def tax(self, taxable_paise):
+        # Slab tax in paise, rounded to the nearest paisa; taxable income is never negative
+        if type(taxable_paise) is int:
+            i = bisect.bisect_right(self._edges, taxable_paise)
+            return (self._intercepts[i] + taxable_paise * self._rates[i]) // BASIS_POINTS
+        income = np.asarray(taxable_paise, dtype=np.int64)
+        i = np.searchsorted(self.edges, income, side='right')
+        tax = self.intercepts[i] + income * self.rates[i]
+        tax //= BASIS_POINTS
+        return tax
+
+    def __repr__(self):
+        return f'PaiseTable({self.key!r})'
+
+
+# Compiled rule tables are immutable and live for the whole process, so
+# their integer twins are keyed by the table object itself
+_tables = {}
+
+
+def paise_table(table):
+    compiled = _tables.get(table)
+    if compiled is None:
+        compiled = _tables[table] = PaiseTable(table)
+    return compiled
+
+
+def cess_paise(tax_paise, year=None):
+    return divide_round(tax_paise * to_basis_points(get_rules(year).cess_rate), BASIS_POINTS)
+
+
+def tax_with_cess(segment, regime, taxable_paise, age, year=None, rounding=True):
+    # Slab tax plus cess for one profile, in paise. With rounding, taxable
+    # income and the result are rounded to tens of rupees (sections 288A/288B).
+    table = paise_table(get_rules(year).table(segment, regime, age))
+    if rounding:
+        taxable_paise = round_to_tens(taxable_paise)
+    tax = table.tax(taxable_paise)
+    tax += cess_paise(tax, year)
+    return round_to_tens(tax) if rounding else tax
+
+
+def calculate_tax_paise(segment, columns, year=None, rounding=True):
+    # Exact counterpart of calculate_tax_columns: the same inputs in rupees,
+    # int64 paise results. Rows the calculator rejects get 0 and an error.
+    if segment not in CALCULATE_TAX_ARGS:
+        raise ValueError(f'Unknown segment: {segment}')
+    for name in REQUIRED_FIELDS[segment]:
+        if name not in columns:
+            raise ValueError(f'Missing required column: {name}')
+    rules = get_rules(year)
+    cess_rate = to_basis_points(rules.cess_rate)
+
+    size = len(columns[REQUIRED_FIELDS[segment][0]])
+    missing = np.zeros(size, dtype=bool)
+    negative = np.zeros(size, dtype=bool)
+    values = {}
+    for name in numeric_fields(segment):
+        column = np.asarray(columns[name], dtype=np.float64) if name in columns else np.zeros(size)
+        blank = np.isnan(column)
+        if name in REQUIRED_FIELDS[segment]:
+            missing |= blank
+        column = np.where(blank, 0.0, column)
+        negative |= column < 0
+        values[name] = column
+    ages = values.pop('age')
+    paise = {name: to_paise(column) for name, column in values.items()}
+
+    total_income = sum(paise[name] for name in INCOME_FIELDS[segment])
+    total_deductions = sum(paise[name] for name in DEDUCTION_FIELDS[segment])
+    taxable_income = total_income - total_deductions
+    negative_taxable = taxable_income < 0
+    invalid = missing | negative | negative_taxable
+    if rounding:
+        taxable_income = round_to_tens(taxable_income)
+    taxable_income[invalid] = 0
+
+    tax = np.zeros(size, dtype=np.int64)
+    for table, _, mask in table_groups(segment, label_columns(segment, columns, size), ages, rules):
+        tax[mask] = paise_table(table).tax(taxable_income[mask])
+    tax += divide_round(tax * cess_rate, BASIS_POINTS)
+    if rounding:
+        tax = round_to_tens(tax)
+    net_tax_payable = tax - paise['tds'] - paise['advance_tax']
+
+    error = np.full(size, '', dtype=object)
+    error[negative_taxable] = NEGATIVE_TAXABLE_ERROR
+    error[negative] = NEGATIVE_VALUES_ERROR
+    error[missing] = MISSING_VALUE_ERROR
+
+    results = {
+        'net_tax_payable': net_tax_payable,
+        'total_income': total_income,
+        'total_deductions': total_deductions,
+        'taxable_income': taxable_income,
+    }
+    for column in results.values():
+        column[invalid] = 0
+    results['error'] = error
+    return results
+
+
+def calculate_tax_exact(segment, columns, year=None, rounding=True):
+    # calculate_tax_paise in rupees, with NaN for rejected rows like
+    # calculate_tax_columns; every value is a whole number of paise
+    results = calculate_tax_paise(segment, columns, year, rounding)
+    invalid = results['error'] != ''
+    for name in ('net_tax_payable', 'total_income', 'total_deductions', 'taxable_income'):
+        column = to_rupees(results[name])
+        column[invalid] = np.nan
+        results[name] = column
+    return results
@@ -0,0 +1,54 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from taxinsight.batch import resolve_mapping, run_shard
+from taxinsight.rules import get_rules
+from taxinsight.segments import SEGMENTS
+
+DEFAULT_SHARD_SIZE = 100000
+
+
+def default_workers():
+    # CPUs this process may run on, which can be fewer than the machine has
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def map_shards(segment, frames, mapping, keep=(), workers=None, year=None, exact=False):
+    # Run each frame on a process pool and yield (result, stats) in input
+    # order. At most two shards per worker are in flight, so memory stays
+    # bounded however many frames there are.
+    workers = workers or default_workers()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for shard, frame in enumerate(frames):
+            pending.append(pool.submit(run_shard, shard, segment, frame, mapping, keep, year, exact))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def calculate_tax_parallel(segment, frame, mapping=None, keep=(), workers=None, shard_size=DEFAULT_SHARD_SIZE, year=None, exact=False):
+    # In-memory variant for a cohort already loaded as a DataFrame. Returns the
+    # results in the cohort's row order along with per-shard statistics.
+    if segment not in SEGMENTS:
+        raise ValueError(f'Unknown segment: {segment}')
+    resolved = resolve_mapping(segment, frame.columns, mapping)
+    # Compile the rules before the pool forks so every worker inherits them
+    year = get_rules(year).year
+    shards = (frame.iloc[start:start + shard_size] for start in range(0, len(frame), shard_size))
+    results, stats = [], []
+    for result, shard_stats in map_shards(segment, shards, resolved, keep, workers, year, exact):
+        results.append(result)
+        stats.append(shard_stats)
+    if not results:
+        # An empty cohort still gets the result columns
+        result, _ = run_shard(0, segment, frame, resolved, keep, year, exact)
+        return result, stats
+    return pd.concat(results), stats
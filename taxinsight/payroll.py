@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from taxinsight.segments import LABEL_DEFAULTS, calculate_tax_columns
+
+MONTHS = ('Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Jan', 'Feb', 'Mar')
+
+# Inputs that can change during the year; every change re-projects the
+# annual tax of just the employees it touches
+LABEL_FIELDS = ('residential_status', 'tax_regime')
+NUMERIC_FIELDS = ('age', 'monthly_salary', 'other_income', 'deduction_80c', 'deduction_80d', 'deduction_80g')
+CHANGE_FIELDS = LABEL_FIELDS + NUMERIC_FIELDS
+
+
+class PayrollBook:
+    # Running TDS state for a whole payroll, one array per field (section 192:
+    # each month deducts the projected annual tax not yet deducted, spread
+    # over the months left). The projected annual tax is cached per
+    # employee; a change re-projects only the employees it touches, and
+    # closing a month only moves the year-to-date totals.
+    def __init__(self, employees, columns, year=None):
+        self.ids = pd.Index(employees)
+        if not self.ids.is_unique:
+            raise ValueError('Employee ids must be unique.')
+        size = len(self.ids)
+        self.year = year
+        self.month = 0
+        self.labels = {}
+        for name in LABEL_FIELDS:
+            values = columns.get(name)
+            self.labels[name] = np.asarray(values, dtype=object).copy() if values is not None else np.full(size, LABEL_DEFAULTS[name], dtype=object)
+        self.values = {}
+        for name in NUMERIC_FIELDS:
+            values = columns.get(name)
+            if values is None and name in ('age', 'monthly_salary'):
+                raise ValueError(f'Missing required column: {name}')
+            self.values[name] = np.asarray(values, dtype=np.float64).copy() if values is not None else np.zeros(size)
+        self.ytd_salary = np.zeros(size)
+        self.ytd_tds = np.zeros(size)
+        self.annual_tax = np.zeros(size)
+        self.error = np.full(size, '', dtype=object)
+        self.reproject(np.arange(size))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, employees):
+        positions = self.ids.get_indexer(pd.Index(employees))
+        if (positions < 0).any():
+            unknown = pd.Index(employees)[positions < 0]
+            raise ValueError(f'Unknown employee(s): {", ".join(map(str, unknown[:5]))}')
+        return positions
+
+    def projected_salary(self, rows):
+        # Salary paid so far plus the current monthly salary for the rest of the year
+        return self.ytd_salary[rows] + self.values['monthly_salary'][rows] * (len(MONTHS) - self.month)
+
+    def reproject(self, rows):
+        columns = {name: values[rows] for name, values in self.labels.items()}
+        columns.update({name: values[rows] for name, values in self.values.items() if name != 'monthly_salary'})
+        columns['salary'] = self.projected_salary(rows)
+        result = calculate_tax_columns('salaried', columns, self.year)
+        # net_tax_payable with no TDS or advance tax is the annual tax with cess
+        self.annual_tax[rows] = result['net_tax_payable']
+        self.error[rows] = result['error']
+
+    def apply(self, employees, changes):
+        # Apply a change-set, e.g. {'monthly_salary': [...]} for a list of
+        # employees, from the current month on; costs O(len(employees))
+        rows = self.positions(employees)
+        unknown = set(changes) - set(CHANGE_FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown field(s): {", ".join(sorted(unknown))}')
+        for name, values in changes.items():
+            if name in LABEL_FIELDS:
+                self.labels[name][rows] = np.asarray(values, dtype=object)
+            else:
+                self.values[name][rows] = np.asarray(values, dtype=np.float64)
+        self.reproject(rows)
+        return rows
+
+    def apply_frame(self, frame, employee_column='employee'):
+        # Bulk change-set as a DataFrame with an employee id column and one
+        # column per changed field
+        changes = {name: frame[name].to_numpy() for name in frame.columns if name != employee_column}
+        return self.apply(frame[employee_column].to_numpy(), changes)
+
+    def monthly_tds(self, rows=slice(None)):
+        # TDS due this month, rounded to the rupee; nothing for rows with errors
+        if self.month >= len(MONTHS):
+            return np.zeros(len(self.annual_tax[rows]))
+        remaining = self.annual_tax[rows] - self.ytd_tds[rows]
+        tds = np.rint(np.maximum(remaining, 0.0) / (len(MONTHS) - self.month))
+        return np.where(self.error[rows] == '', tds, 0.0)
+
+    def close_month(self):
+        # Deduct this month's TDS and pay this month's salary. The projected
+        # annual salary, and so the cached annual tax, does not change.
+        if self.month >= len(MONTHS):
+            raise ValueError('The payroll year is already closed.')
+        tds = self.monthly_tds()
+        self.ytd_tds += tds
+        self.ytd_salary += self.values['monthly_salary']
+        self.month += 1
+        return tds
+
+    def schedule(self, employees=None):
+        # TDS for each remaining month if nothing else changes
+        rows = self.positions(employees) if employees is not None else slice(None)
+        tds = self.monthly_tds(rows)
+        frame = pd.DataFrame({month: tds for month in MONTHS[self.month:]}, index=self.ids[rows])
+        frame.index.name = 'employee'
+        return frame
+
+    def snapshot(self):
+        frame = pd.DataFrame(self.labels | self.values, index=self.ids)
+        frame['ytd_salary'] = self.ytd_salary
+        frame['ytd_tds'] = self.ytd_tds
+        frame['annual_tax'] = self.annual_tax
+        frame['tds_this_month'] = self.monthly_tds()
+        frame['error'] = self.error
+        frame.index.name = 'employee'
+        return frame
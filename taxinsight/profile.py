@@ -0,0 +1,162 @@
+import numpy as np
+
+from taxinsight.compare import slab_segment
+from taxinsight.rules import get_rules
+from taxinsight.segments import (
+    CALCULATE_TAX_ARGS,
+    DEDUCTION_FIELDS,
+    INCOME_FIELDS,
+    LABEL_DEFAULTS,
+    NEGATIVE_TAXABLE_ERROR,
+    NEGATIVE_VALUES_ERROR,
+    REQUIRED_FIELDS,
+    SEGMENTS,
+    calculate_tax_columns,
+    label_columns,
+    numeric_fields,
+    sum_columns,
+)
+
+
+class TaxProfile:
+    # One taxpayer's calculate_tax arguments as named slots. Each segment has
+    # its own subclass whose slots are exactly that page's arguments (the
+    # senior page's total_deductions is an argument, hence deductions()).
+    __slots__ = ()
+    segment = None
+
+    def __init__(self, *args, **kwargs):
+        names = CALCULATE_TAX_ARGS[self.segment]
+        if len(args) > len(names):
+            raise ValueError(f'{self.segment} profiles take at most {len(names)} values.')
+        values = dict(zip(names, args))
+        for name, value in kwargs.items():
+            if name not in names:
+                raise ValueError(f'Unknown field: {name}')
+            if name in values:
+                raise ValueError(f'{name} given twice.')
+            values[name] = value
+        for name in REQUIRED_FIELDS[self.segment]:
+            if name not in values:
+                raise ValueError(f'Missing required field: {name}')
+        for name in names:
+            setattr(self, name, values.get(name, LABEL_DEFAULTS.get(name, 0)))
+
+    def arguments(self):
+        # Positional arguments for the page's calculate_tax
+        return tuple(getattr(self, name) for name in CALCULATE_TAX_ARGS[self.segment])
+
+    def validate(self):
+        if any(getattr(self, name) < 0 for name in numeric_fields(self.segment)):
+            raise ValueError(NEGATIVE_VALUES_ERROR)
+
+    def gross_income(self):
+        return sum(getattr(self, name) for name in INCOME_FIELDS[self.segment])
+
+    def deductions(self):
+        return sum(getattr(self, name) for name in DEDUCTION_FIELDS[self.segment])
+
+    def calculate(self, year=None):
+        # Same result as the page's calculate_tax:
+        # (net_tax_payable, total_income, total_deductions, taxable_income)
+        self.validate()
+        total_income = self.gross_income()
+        total_deductions = self.deductions()
+        taxable_income = total_income - total_deductions
+        if taxable_income < 0:
+            raise ValueError(NEGATIVE_TAXABLE_ERROR)
+        rules = get_rules(year)
+        table = rules.table(slab_segment(self.segment, getattr(self, 'residential_status', 'Resident')), self.tax_regime, self.age)
+        tax = table.tax(taxable_income)
+        tax += tax * rules.cess_rate
+        return tax - self.tds - self.advance_tax, total_income, total_deductions, taxable_income
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in CALCULATE_TAX_ARGS[self.segment])
+        return f'{type(self).__name__}({fields})'
+
+
+class SalariedProfile(TaxProfile):
+    __slots__ = CALCULATE_TAX_ARGS['salaried']
+    segment = 'salaried'
+
+
+class BusinessProfile(TaxProfile):
+    __slots__ = CALCULATE_TAX_ARGS['business']
+    segment = 'business'
+
+
+class SeniorProfile(TaxProfile):
+    __slots__ = CALCULATE_TAX_ARGS['senior']
+    segment = 'senior'
+
+
+PROFILE_TYPES = {profile.segment: profile for profile in (SalariedProfile, BusinessProfile, SeniorProfile)}
+
+
+def make_profile(segment, *args, **kwargs):
+    if segment not in PROFILE_TYPES:
+        raise ValueError(f'Unknown segment: {segment}')
+    return PROFILE_TYPES[segment](*args, **kwargs)
+
+
+class TaxProfileBatch:
+    # Struct of arrays for a cohort: one float64 column per numeric argument
+    # (NaN where a value is missing) and one object column per label.
+    # Validation, totals and slab dispatch all run on the columns.
+    __slots__ = ('segment', 'columns')
+
+    def __init__(self, segment, columns):
+        if segment not in SEGMENTS:
+            raise ValueError(f'Unknown segment: {segment}')
+        for name in REQUIRED_FIELDS[segment]:
+            if name not in columns:
+                raise ValueError(f'Missing required column: {name}')
+        size = len(columns[REQUIRED_FIELDS[segment][0]])
+        normalized = label_columns(segment, columns, size)
+        for name in numeric_fields(segment):
+            normalized[name] = np.asarray(columns[name], dtype=np.float64) if name in columns else np.zeros(size)
+        self.segment = segment
+        self.columns = normalized
+
+    @classmethod
+    def from_frame(cls, segment, frame, mapping=None):
+        # mapping: argument name -> column name, for differently named columns
+        mapping = mapping or {name: name for name in CALCULATE_TAX_ARGS[segment] if name in frame.columns}
+        return cls(segment, {name: frame[column].to_numpy() for name, column in mapping.items()})
+
+    @classmethod
+    def from_arrow(cls, segment, table, mapping=None):
+        names = set(table.column_names)
+        mapping = mapping or {name: name for name in CALCULATE_TAX_ARGS[segment] if name in names}
+        return cls(segment, {name: table.column(column).to_numpy(zero_copy_only=False) for name, column in mapping.items()})
+
+    @classmethod
+    def from_profiles(cls, segment, profiles):
+        columns = {}
+        for name in CALCULATE_TAX_ARGS[segment]:
+            dtype = object if name in LABEL_DEFAULTS else np.float64
+            columns[name] = np.fromiter((getattr(profile, name) for profile in profiles), dtype=dtype, count=len(profiles))
+        return cls(segment, columns)
+
+    def __len__(self):
+        return len(self.columns['age'])
+
+    def __getitem__(self, index):
+        values = {name: column[index] for name, column in self.columns.items()}
+        values = {name: value if name in LABEL_DEFAULTS else float(value) for name, value in values.items()}
+        return make_profile(self.segment, **values)
+
+    def gross_income(self):
+        return sum_columns(self.columns, INCOME_FIELDS[self.segment])
+
+    def deductions(self):
+        return sum_columns(self.columns, DEDUCTION_FIELDS[self.segment])
+
+    def calculate(self, year=None):
+        # calculate_tax for every row; rows the page would reject get NaN
+        # results and the error message
+        return calculate_tax_columns(self.segment, self.columns, year)
+
+    def errors(self, year=None):
+        return self.calculate(year)['error']
@@ -0,0 +1,210 @@
+import json
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from taxinsight.batch import is_parquet
+from taxinsight.rules import get_rules
+from taxinsight.segments import RESULT_FIELDS, calculate_tax_columns, label_columns, table_groups
+from taxinsight.slabs import NEW_REGIME, OLD_REGIME
+
+# Index columns, in sort order; bracket is the slab the taxable income falls
+# in (0 = the first slab) and -1 for rows with errors
+INDEX_FIELDS = ('segment', 'regime', 'bracket')
+REGIMES = (NEW_REGIME, OLD_REGIME)  # in sort order
+
+# Rows per Parquet row group; smaller groups prune more finely
+ROW_GROUP_SIZE = 65536
+
+# Schema metadata key holding the index, so saved result sets open without a scan
+INDEX_METADATA = b'taxinsight.index'
+
+
+def bracket_column(segment, columns, taxable_income, year=None):
+    # Regime code (position in REGIMES) and slab index of each row's taxable
+    # income under its own slab table
+    size = len(taxable_income)
+    rules = get_rules(year)
+    regime = np.zeros(size, dtype=np.int8)
+    bracket = np.full(size, -1, dtype=np.int8)
+    valid = ~np.isnan(taxable_income)
+    ages = np.nan_to_num(np.asarray(columns['age'], dtype=np.float64))
+    for table, table_regime, mask in table_groups(segment, label_columns(segment, columns, size), ages, rules):
+        regime[mask] = REGIMES.index(table_regime)
+        mask &= valid
+        bracket[mask] = table.bracket(taxable_income[mask])
+    return regime, bracket
+
+
+class ResultSet:
+    # calculate_tax results held as one Arrow table, sorted by segment,
+    # regime and bracket. An index of where each (segment, regime, bracket)
+    # group starts and stops turns filters on those keys into zero-copy
+    # slices; Parquet files keep the same order, so their row-group
+    # statistics let readers skip groups that cannot match.
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index=None):
+        self.table = table
+        self.index = index if index is not None else build_index(table)
+
+    @classmethod
+    def compute(cls, segment, columns, year=None, keep=None):
+        # Run calculate_tax over input columns; `keep` maps extra output
+        # columns (e.g. an employee id) to arrays carried along unchanged
+        return cls.from_results(segment, columns, calculate_tax_columns(segment, columns, year), year, keep)
+
+    @classmethod
+    def from_results(cls, segment, columns, results, year=None, keep=None):
+        # `results` holds RESULT_FIELDS and error as calculate_tax_columns
+        # returns them; `columns` only needs age and the regime labels
+        regime, bracket = bracket_column(segment, columns, np.asarray(results['taxable_income'], dtype=np.float64), year)
+        order = np.argsort(regime.astype(np.int16) * 256 + bracket, kind='stable')
+        regime, bracket = regime[order], bracket[order]
+        take = pa.array(order)
+
+        arrays = {name: pa.array(np.asarray(values)).take(take) for name, values in (keep or {}).items()}
+        arrays['segment'] = pa.repeat(pa.scalar(segment), len(order))
+        arrays['regime'] = pc.cast(pa.DictionaryArray.from_arrays(regime, REGIMES), pa.string())
+        arrays['bracket'] = pa.array(bracket)
+        for name in RESULT_FIELDS:
+            arrays[name] = pa.array(np.asarray(results[name], dtype=np.float64)[order], from_pandas=True)
+        arrays['error'] = pa.array(np.asarray(results['error'], dtype=object), pa.string()).take(take)
+
+        starts = np.flatnonzero(np.diff(regime, prepend=-1) | np.diff(bracket, prepend=-2))
+        stops = np.append(starts[1:], len(order))
+        index = {(segment, REGIMES[regime[start]], int(bracket[start])): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+        return cls(pa.table(arrays), index)
+
+    @classmethod
+    def read_batch(cls, segment, path, year=None):
+        # Index a taxinsight.batch output file; age, tax_regime and (for the
+        # salaried) residential_status must have been kept with --keep
+        if is_parquet(path):
+            table = pq.read_table(path)
+        else:
+            table = csv.read_csv(path, convert_options=csv.ConvertOptions(column_types={'error': pa.string()}, strings_can_be_null=False))
+        if 'age' not in table.column_names:
+            raise ValueError('Batch output has no age column; rerun it with --keep age.')
+        columns = {name: table.column(name).to_numpy() for name in table.column_names}
+        results = {name: columns.pop(name) for name in (*RESULT_FIELDS, 'error')}
+        return cls.from_results(segment, columns, results, year, columns)
+
+    @classmethod
+    def from_table(cls, table):
+        # Any table with the INDEX_FIELDS columns, e.g. a filtered Parquet read
+        return cls(table.sort_by([(name, 'ascending') for name in INDEX_FIELDS]))
+
+    @classmethod
+    def concat(cls, result_sets):
+        return cls.from_table(pa.concat_tables([result.table for result in result_sets]))
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def filter(self, segment=None, regime=None, bracket=None, where=None):
+        # Rows matching every given key; each key may be a value or a list.
+        # `where` is an optional pyarrow.compute expression applied to the
+        # matching slices only, e.g. pc.field('net_tax_payable') > 100000.
+        wanted = [as_set(segment), as_set(regime), as_set(bracket)]
+        index = {}
+        slices = []
+        offset = 0
+        for key, (start, stop) in self.index.items():
+            if all(allowed is None or value in allowed for value, allowed in zip(key, wanted)):
+                slices.append(self.table.slice(start, stop - start))
+                index[key] = (offset, offset + stop - start)
+                offset += stop - start
+        table = pa.concat_tables(slices) if slices else self.table.schema.empty_table()
+        if where is not None:
+            return ResultSet(table.filter(where))
+        return ResultSet(table, index)
+
+    def counts(self):
+        # Rows per (segment, regime, bracket), straight from the index
+        return {key: stop - start for key, (start, stop) in self.index.items()}
+
+    def to_pandas(self):
+        return self.table.to_pandas()
+
+    def with_index_metadata(self):
+        index = [[*key, start, stop] for key, (start, stop) in self.index.items()]
+        return self.table.replace_schema_metadata({**(self.table.schema.metadata or {}), INDEX_METADATA: json.dumps(index)})
+
+    def write_parquet(self, path, row_group_size=ROW_GROUP_SIZE):
+        pq.write_table(self.with_index_metadata(), path, row_group_size=row_group_size)
+
+    def write_ipc(self, path):
+        # Arrow IPC file that open_ipc maps into memory without copying
+        table = self.with_index_metadata()
+        with pa.OSFile(str(path), 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    @classmethod
+    def read_parquet(cls, path, segment=None, regime=None, bracket=None, columns=None):
+        # Filters are pushed down to the Parquet reader, which skips row
+        # groups whose statistics rule them out
+        filters = []
+        for name, value in zip(INDEX_FIELDS, (segment, regime, bracket)):
+            allowed = as_set(value)
+            if allowed is not None:
+                filters.append((name, 'in', sorted(allowed)))
+        if columns is not None:
+            columns = list(dict.fromkeys([*INDEX_FIELDS, *columns]))
+        table = pq.read_table(path, columns=columns, filters=filters or None)
+        if not filters:
+            return cls(table, stored_index(table))
+        return cls.from_table(table)
+
+    @classmethod
+    def open_ipc(cls, path):
+        # Memory-mapped: pages are read from disk only as columns are used
+        table = ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+        return cls(table, stored_index(table))
+
+
+def as_set(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return set(value)
+    return {value}
+
+
+def stored_index(table):
+    # Index saved by write_parquet/write_ipc, or None to rebuild it
+    metadata = table.schema.metadata or {}
+    if INDEX_METADATA not in metadata:
+        return None
+    return {(segment, regime, bracket): (start, stop) for segment, regime, bracket, start, stop in json.loads(metadata[INDEX_METADATA])}
+
+
+def key_codes(column):
+    # Integer codes and their values for one key column
+    if pa.types.is_integer(column.type):
+        codes = column.to_numpy()
+        return codes, None
+    encoded = pc.dictionary_encode(column).combine_chunks()
+    return encoded.indices.to_numpy(), encoded.dictionary.to_pylist()
+
+
+def build_index(table):
+    # (segment, regime, bracket) -> (start, stop) over a table sorted by those keys
+    if table.num_rows == 0:
+        return {}
+    keys = [key_codes(table.column(name)) for name in INDEX_FIELDS]
+    change = np.zeros(table.num_rows, dtype=bool)
+    change[0] = True
+    for codes, _ in keys:
+        change[1:] |= codes[1:] != codes[:-1]
+    starts = np.flatnonzero(change)
+    stops = np.append(starts[1:], table.num_rows)
+    index = {}
+    for start, stop in zip(starts, stops):
+        key = tuple(int(codes[start]) if values is None else values[codes[start]] for codes, values in keys)
+        index[key] = (int(start), int(stop))
+    return index
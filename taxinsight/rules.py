@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+from taxinsight.slabs import AGE_BAND_LIMITS, AGE_BANDS, NEW_REGIME, OLD_REGIME, SlabTable, age_band, is_scalar, regime_key
+
+# One declarative rule file per assessment year, named ay<year>.json
+RULES_DIR = os.environ.get('TAXINSIGHT_RULES_DIR', os.path.join(os.path.dirname(__file__), 'data'))
+
+SEGMENTS = ('salaried', 'nri', 'business', 'senior')
+REGIMES = (OLD_REGIME, NEW_REGIME)
+
+
+class RuleSet:
+    # The compiled, read-only rules of one assessment year
+    __slots__ = ('year', 'description', 'cess_rate', 'version', 'tables')
+
+    def __init__(self, year, description, cess_rate, version, tables):
+        self.year = year
+        self.description = description
+        self.cess_rate = cess_rate
+        self.version = version
+        self.tables = MappingProxyType(tables)
+
+    def table(self, segment, regime, age):
+        return self.tables[(segment, regime_key(regime), age_band(age))]
+
+    def slab_tax(self, segment, regime, taxable_income, age):
+        # Scalar or element-wise slab tax (before cess) for one segment and regime
+        if is_scalar(age):
+            return self.table(segment, regime, age).tax(taxable_income)
+
+        regime = regime_key(regime)
+        income = np.asarray(taxable_income, dtype=np.float64)
+        bands = np.searchsorted(AGE_BAND_LIMITS, age, side='right')
+        income, bands = np.broadcast_arrays(income, bands)
+        tax = np.empty(income.shape)
+        for code, band in enumerate(AGE_BANDS):
+            mask = bands == code
+            if mask.any():
+                tax[mask] = self.tables[(segment, regime, band)].tax(income[mask])
+        return tax
+
+    def __repr__(self):
+        return f'RuleSet({self.year!r}, version={self.version[:12]!r})'
+
+
+def rule_path(year):
+    return os.path.join(RULES_DIR, f'ay{year}.json')
+
+
+def available_years():
+    years = [name[2:-5] for name in os.listdir(RULES_DIR) if name.startswith('ay') and name.endswith('.json')]
+    return sorted(years)
+
+
+def compile_rules(data, version, source='rules'):
+    # Validate a parsed rule file and compile every slab schedule it references
+    for field in ('assessment_year', 'cess_rate', 'schedules', 'segments'):
+        if field not in data:
+            raise ValueError(f'{source}: missing "{field}".')
+    cess_rate = data['cess_rate']
+    if isinstance(cess_rate, bool) or not isinstance(cess_rate, (int, float)) or not 0 <= cess_rate < 1:
+        raise ValueError(f'{source}: cess_rate must be a number between 0 and 1.')
+
+    schedules = {}
+    for name, schedule in data['schedules'].items():
+        if not isinstance(schedule, dict) or set(schedule) != {'bounds', 'rates'}:
+            raise ValueError(f'{source}: schedule "{name}" must have exactly "bounds" and "rates".')
+        schedules[name] = SlabTable(name, schedule['bounds'], schedule['rates'])
+
+    tables = {}
+    for segment in SEGMENTS:
+        regimes = data['segments'].get(segment)
+        if not isinstance(regimes, dict):
+            raise ValueError(f'{source}: missing segment "{segment}".')
+        for regime in REGIMES:
+            bands = regimes.get(regime)
+            if not isinstance(bands, dict):
+                raise ValueError(f'{source}: segment "{segment}" is missing the "{regime}" regime.')
+            for band in AGE_BANDS:
+                name = bands.get(band)
+                if name not in schedules:
+                    raise ValueError(f'{source}: {segment}/{regime}/{band} must name one of the schedules.')
+                tables[(segment, regime, band)] = schedules[name]
+
+    return RuleSet(str(data['assessment_year']), data.get('description', ''), float(cess_rate), version, tables)
+
+
+def load_rules(year):
+    path = rule_path(year)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+    if str(data.get('assessment_year')) != year:
+        raise ValueError(f'{path}: assessment_year does not match the file name.')
+    return compile_rules(data, hashlib.sha256(raw).hexdigest(), path)
+
+
+DEFAULT_YEAR = os.environ.get('TAXINSIGHT_YEAR') or available_years()[-1]
+
+# Compiled rule sets, shared by every session; worker processes forked after
+# the first lookup inherit them without recompiling
+_compiled = {}
+_lock = threading.Lock()
+
+
+def get_rules(year=None):
+    year = year or DEFAULT_YEAR
+    rules = _compiled.get(year)
+    if rules is None:
+        with _lock:
+            rules = _compiled.get(year)
+            if rules is None:
+                if year not in available_years():
+                    raise ValueError(f'No tax rules for assessment year {year}.')
+                rules = _compiled[year] = load_rules(year)
+    return rules
+
+
+def get_table(segment, regime, age, year=None):
+    return get_rules(year).table(segment, regime, age)
+
+
+def slab_tax(segment, regime, taxable_income, age, year=None):
+    return get_rules(year).slab_tax(segment, regime, taxable_income, age)
+
+
+def rules_fingerprint():
+    # Changes whenever any rule file or the default year changes; keys
+    # results that outlive the process, such as the on-disk cache
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256(DEFAULT_YEAR.encode())
+        for year in available_years():
+            digest.update(f'{year}:{get_rules(year).version}'.encode())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+_fingerprint = None
@@ -0,0 +1,166 @@
+import numpy as np
+
+from taxinsight.rules import get_rules
+from taxinsight.slabs import AGE_BAND_LIMITS, AGE_BANDS, NEW_REGIME, NEW_REGIME_LABELS, OLD_REGIME
+
+SEGMENTS = ('salaried', 'business', 'senior')
+
+# Arguments of each page's calculate_tax, in call order
+CALCULATE_TAX_ARGS = {
+    'salaried': ('residential_status', 'tax_regime', 'age', 'salary', 'house_property_income', 'capital_gains', 'other_income', 'deduction_80c', 'deduction_80d', 'deduction_80g', 'tds', 'advance_tax'),
+    'business': ('age', 'tax_regime', 'business_income', 'house_property_income', 'capital_gains', 'other_income', 'deduction_80c', 'deduction_80d', 'deduction_80g', 'tds', 'advance_tax'),
+    'senior': ('age', 'tax_regime', 'pension_income', 'house_property_income', 'capital_gains', 'other_income', 'total_deductions', 'tds', 'advance_tax'),
+}
+
+INCOME_FIELDS = {
+    'salaried': ('salary', 'house_property_income', 'capital_gains', 'other_income'),
+    'business': ('business_income', 'house_property_income', 'capital_gains', 'other_income'),
+    'senior': ('pension_income', 'house_property_income', 'capital_gains', 'other_income'),
+}
+
+DEDUCTION_FIELDS = {
+    'salaried': ('deduction_80c', 'deduction_80d', 'deduction_80g'),
+    'business': ('deduction_80c', 'deduction_80d', 'deduction_80g'),
+    'senior': ('total_deductions',),
+}
+
+# Whether the page lets deductions reduce income under the New Tax Regime;
+# the senior citizens page drops them when the New Tax Regime is selected
+NEW_REGIME_DEDUCTIONS = {
+    'salaried': True,
+    'business': True,
+    'senior': False,
+}
+
+# Non-numeric arguments and the value the pages preselect for them
+LABEL_DEFAULTS = {
+    'residential_status': 'Resident',
+    'tax_regime': 'Old Tax Regime',
+}
+
+# Every other argument defaults to 0 when it is missing from the input
+REQUIRED_FIELDS = {segment: ('age', INCOME_FIELDS[segment][0]) for segment in SEGMENTS}
+
+RESULT_FIELDS = ('net_tax_payable', 'total_income', 'total_deductions', 'taxable_income')
+
+NEGATIVE_VALUES_ERROR = 'All values must be non-negative.'
+NEGATIVE_TAXABLE_ERROR = 'Taxable income is negative after deductions.'
+MISSING_VALUE_ERROR = 'Required value is missing.'
+
+
+def numeric_fields(segment):
+    return tuple(name for name in CALCULATE_TAX_ARGS[segment] if name not in LABEL_DEFAULTS)
+
+
+def sum_columns(values, names):
+    total = values[names[0]].copy()
+    for name in names[1:]:
+        total += values[name]
+    return total
+
+
+def slab_segments(segment, residential_status):
+    # Which slab segment each row is taxed under; non-residents use the NRI tables
+    if segment != 'salaried':
+        return {segment: None}
+    resident = np.asarray(residential_status) == 'Resident'
+    return {'salaried': resident, 'nri': ~resident}
+
+
+def table_groups(segment, labels, ages, rules):
+    # (table, regime, mask) for every slab table some row is taxed under
+    new_regime = np.isin(labels['tax_regime'], NEW_REGIME_LABELS)
+    bands = np.searchsorted(AGE_BAND_LIMITS, ages, side='right')
+    for slab_segment, segment_mask in slab_segments(segment, labels.get('residential_status')).items():
+        for regime, regime_mask in ((NEW_REGIME, new_regime), (OLD_REGIME, ~new_regime)):
+            for code, band in enumerate(AGE_BANDS):
+                mask = regime_mask & (bands == code)
+                if segment_mask is not None:
+                    mask &= segment_mask
+                if mask.any():
+                    yield rules.tables[(slab_segment, regime, band)], regime, mask
+
+
+def label_columns(segment, columns, size):
+    # Non-numeric arguments with blanks and missing columns set to the page defaults
+    labels = {}
+    for name, default in LABEL_DEFAULTS.items():
+        if name not in CALCULATE_TAX_ARGS[segment]:
+            continue
+        if name in columns:
+            column = np.asarray(columns[name], dtype=object)
+            # NaN != NaN; a CSV read by Arrow gives '' where pandas gives NaN
+            labels[name] = np.where((column == column) & (column != ''), column, default)
+        else:
+            labels[name] = np.full(size, default, dtype=object)
+    return labels
+
+
+def calculate_tax_columns(segment, columns, year=None):
+    # Column-wise equivalent of the pages' calculate_tax. Rows that would raise
+    # a ValueError there get NaN results and the error message instead.
+    if segment not in CALCULATE_TAX_ARGS:
+        raise ValueError(f'Unknown segment: {segment}')
+    for name in REQUIRED_FIELDS[segment]:
+        if name not in columns:
+            raise ValueError(f'Missing required column: {name}')
+    rules = get_rules(year)
+
+    size = len(columns[REQUIRED_FIELDS[segment][0]])
+    missing = np.zeros(size, dtype=bool)
+    values = {}
+    for name in numeric_fields(segment):
+        if name not in columns:
+            values[name] = np.zeros(size)
+            continue
+        column = np.asarray(columns[name], dtype=np.float64)
+        blank = np.isnan(column)
+        if blank.any():
+            if name in REQUIRED_FIELDS[segment]:
+                missing |= blank
+            column = np.where(blank, 0.0, column)
+        values[name] = column
+
+    labels = label_columns(segment, columns, size)
+
+    negative = np.zeros(size, dtype=bool)
+    for column in values.values():
+        negative |= column < 0
+
+    total_income = sum_columns(values, INCOME_FIELDS[segment])
+    total_deductions = sum_columns(values, DEDUCTION_FIELDS[segment])
+    taxable_income = total_income - total_deductions
+
+    negative_taxable = taxable_income < 0
+    invalid = missing | negative | negative_taxable
+
+    # Apply Tax Slabs, one compiled table lookup per (segment, regime) group
+    tax = np.zeros(size)
+    new_regime = np.isin(labels['tax_regime'], NEW_REGIME_LABELS)
+    for slab_segment, segment_mask in slab_segments(segment, labels.get('residential_status')).items():
+        for regime, regime_mask in ((NEW_REGIME, new_regime), (OLD_REGIME, ~new_regime)):
+            mask = regime_mask & ~invalid
+            if segment_mask is not None:
+                mask &= segment_mask
+            if mask.any():
+                tax[mask] = rules.slab_tax(slab_segment, regime, taxable_income[mask], values['age'][mask])
+
+    # Add Cess and subtract TDS and Advance Tax
+    tax += tax * rules.cess_rate
+    net_tax_payable = tax - values['tds'] - values['advance_tax']
+
+    error = np.full(size, '', dtype=object)
+    error[negative_taxable] = NEGATIVE_TAXABLE_ERROR
+    error[negative] = NEGATIVE_VALUES_ERROR
+    error[missing] = MISSING_VALUE_ERROR
+
+    results = {
+        'net_tax_payable': net_tax_payable,
+        'total_income': total_income,
+        'total_deductions': total_deductions,
+        'taxable_income': taxable_income,
+    }
+    for column in results.values():
+        column[invalid] = np.nan
+    results['error'] = error
+    return results
@@ -0,0 +1,175 @@
+import argparse
+import json
+import math
+import multiprocessing
+import sys
+import time
+from collections import deque
+
+import numpy as np
+from aiohttp import web
+
+from pages import business_profession, salaried, senior_citizens
+from taxinsight.memo import cache_stats
+from taxinsight.profile import TaxProfileBatch, make_profile
+from taxinsight.rules import available_years
+from taxinsight.segments import CALCULATE_TAX_ARGS, LABEL_DEFAULTS, RESULT_FIELDS, SEGMENTS
+
+CALCULATORS = {
+    'salaried': salaried.calculate_tax,
+    'business': business_profession.calculate_tax,
+    'senior': senior_citizens.calculate_tax,
+}
+
+# Latency samples kept per route for the percentiles in /stats
+LATENCY_WINDOW = 10000
+MAX_BATCH_SIZE = 100000
+
+
+def bad_request(message):
+    return web.json_response({'error': message}, status=400)
+
+
+def parse_profile(segment, profile):
+    # Turn a JSON profile into a TaxProfile, filling the page defaults
+    if not isinstance(profile, dict):
+        raise ValueError('Each profile must be a JSON object.')
+    values = {name: value for name, value in profile.items() if name not in ('segment', 'year')}
+    unknown = set(values) - set(CALCULATE_TAX_ARGS[segment])
+    if unknown:
+        raise ValueError(f'Unknown field(s): {", ".join(sorted(unknown))}')
+    for name, value in values.items():
+        if name in LABEL_DEFAULTS:
+            if not isinstance(value, str):
+                raise ValueError(f'{name} must be a string.')
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f'{name} must be a number.')
+    return make_profile(segment, **values)
+
+
+def profile_year(profile):
+    year = profile.get('year') if isinstance(profile, dict) else None
+    if year is not None and year not in available_years():
+        raise ValueError(f'No tax rules for assessment year {year}.')
+    return year
+
+
+def result_json(values):
+    # NaN (rows with errors) is not valid JSON
+    return {name: None if isinstance(value, float) and math.isnan(value) else value for name, value in zip(RESULT_FIELDS, values)}
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({'error': 'Request body must be valid JSON.'}), content_type='application/json')
+
+
+async def calculate(request):
+    segment = request.match_info['segment']
+    if segment not in CALCULATORS:
+        raise web.HTTPNotFound()
+    profile = await read_json(request)
+    try:
+        arguments = parse_profile(segment, profile).arguments()
+        year = profile_year(profile)
+        return web.json_response(result_json(CALCULATORS[segment](*arguments, year=year)))
+    except ValueError as e:
+        return bad_request(str(e))
+
+
+async def calculate_batch(request):
+    # Profiles are grouped by segment and year and computed column-wise; every profile
+    # gets a result (or an error) at its own position in the response
+    profiles = await read_json(request)
+    if not isinstance(profiles, list):
+        return bad_request('Request body must be a JSON array of profiles.')
+    if len(profiles) > MAX_BATCH_SIZE:
+        return bad_request(f'At most {MAX_BATCH_SIZE} profiles per request.')
+
+    results = [None] * len(profiles)
+    groups = {}
+    for position, profile in enumerate(profiles):
+        segment = profile.get('segment') if isinstance(profile, dict) else None
+        if segment not in SEGMENTS:
+            results[position] = {'error': f'segment must be one of: {", ".join(SEGMENTS)}'}
+            continue
+        try:
+            parsed = parse_profile(segment, profile)
+            groups.setdefault((segment, profile_year(profile)), []).append((position, parsed))
+        except ValueError as e:
+            results[position] = {'error': str(e)}
+
+    for (segment, year), rows in groups.items():
+        computed = TaxProfileBatch.from_profiles(segment, [parsed for _, parsed in rows]).calculate(year)
+        values = zip(*(computed[name].tolist() for name in RESULT_FIELDS))
+        for (position, _), row, error in zip(rows, values, computed['error']):
+            results[position] = {'error': error} if error else result_json(row)
+    return web.json_response(results)
+
+
+async def stats(request):
+    latencies = {}
+    for route, samples in request.app['latencies'].items():
+        if samples:
+            p50, p95, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 95, 99])
+            latencies[route] = {'count': len(samples), 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+    return web.json_response({
+        'uptime_seconds': time.monotonic() - request.app['started'],
+        'latency': latencies,
+        'caches': cache_stats(),
+    })
+
+
+@web.middleware
+async def timing(request, handler):
+    # Record per-route latency and report it to the client via Server-Timing
+    started = time.perf_counter()
+    response = await handler(request)
+    elapsed = (time.perf_counter() - started) * 1000
+    route = request.match_info.route.resource
+    name = route.canonical if route is not None else 'unmatched'
+    request.app['latencies'].setdefault(name, deque(maxlen=LATENCY_WINDOW)).append(elapsed)
+    response.headers['Server-Timing'] = f'app;dur={elapsed:.3f}'
+    return response
+
+
+def create_app():
+    app = web.Application(middlewares=[timing])
+    app['latencies'] = {}
+    app['started'] = time.monotonic()
+    app.router.add_post('/tax/batch', calculate_batch)
+    app.router.add_post('/tax/{segment}', calculate)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+def serve(host, port, reuse_port=False):
+    web.run_app(create_app(), host=host, port=port, reuse_port=reuse_port, access_log=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m taxinsight.service', description='Serve the tax calculators as JSON endpoints.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1, help='server processes sharing the port (Linux SO_REUSEPORT); default: %(default)s')
+    args = parser.parse_args(argv)
+
+    if args.workers <= 1:
+        serve(args.host, args.port)
+        return 0
+    processes = [multiprocessing.Process(target=serve, args=(args.host, args.port, True)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
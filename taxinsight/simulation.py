@@ -0,0 +1,125 @@
+import math
+from types import MappingProxyType
+
+import numpy as np
+
+from taxinsight.compare import slab_segment
+from taxinsight.memo import memoize
+from taxinsight.rules import get_rules
+from taxinsight.segments import INCOME_FIELDS, NEW_REGIME_DEDUCTIONS
+from taxinsight.slabs import NEW_REGIME, regime_key
+
+DEFAULT_SCENARIOS = 1000000
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Distributions an income head can follow, with their parameters in order:
+#   ('fixed', value)
+#   ('uniform', low, high)
+#   ('normal', mean, standard deviation)
+#   ('lognormal', median, sigma of the log)
+#   ('triangular', low, most likely, high)
+# Draws below zero are treated as no income from that head.
+DISTRIBUTIONS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'triangular': 3}
+
+
+def check_distribution(name, spec):
+    if isinstance(spec, (int, float)):
+        return ('fixed', float(spec))
+    spec = tuple(spec)
+    if not spec or spec[0] not in DISTRIBUTIONS:
+        raise ValueError(f'{name}: distribution must be one of {", ".join(DISTRIBUTIONS)}.')
+    if len(spec) != DISTRIBUTIONS[spec[0]] + 1:
+        raise ValueError(f'{name}: {spec[0]} takes {DISTRIBUTIONS[spec[0]]} parameter(s).')
+    kind, *params = spec
+    if kind == 'uniform' and params[0] > params[1]:
+        raise ValueError(f'{name}: uniform low must not exceed high.')
+    if kind in ('normal', 'lognormal') and params[1] < 0:
+        raise ValueError(f'{name}: the spread must be non-negative.')
+    if kind == 'lognormal' and params[0] <= 0:
+        raise ValueError(f'{name}: the lognormal median must be positive.')
+    if kind == 'triangular' and not params[0] <= params[1] <= params[2]:
+        raise ValueError(f'{name}: triangular needs low <= most likely <= high.')
+    return spec
+
+
+def add_draws(total, scratch, rng, spec):
+    # Add one income head's draws to `total`, reusing `scratch` so no new
+    # arrays are allocated per head
+    kind, *params = spec
+    if kind == 'fixed':
+        total += max(params[0], 0.0)
+        return
+    if kind == 'uniform':
+        low, high = params
+        rng.random(out=scratch)
+        scratch *= high - low
+        scratch += low
+    elif kind == 'normal':
+        mean, sd = params
+        rng.standard_normal(out=scratch)
+        scratch *= sd
+        scratch += mean
+    elif kind == 'lognormal':
+        median, sigma = params
+        rng.standard_normal(out=scratch)
+        scratch *= sigma
+        scratch += math.log(median)
+        np.exp(scratch, out=scratch)
+    else:
+        # Inverse CDF of the triangular distribution
+        low, mode, high = params
+        width = high - low
+        split = (mode - low) / width if width else 0.0
+        rng.random(out=scratch)
+        below = scratch < split
+        rising = np.sqrt(scratch * width * (mode - low)) + low
+        np.subtract(1.0, scratch, out=scratch)
+        scratch *= width * (high - mode)
+        np.sqrt(scratch, out=scratch)
+        np.subtract(high, scratch, out=scratch)
+        np.copyto(scratch, rising, where=below)
+    np.maximum(scratch, 0.0, out=scratch)
+    total += scratch
+
+
+@memoize(maxsize=64)
+def simulate(segment, incomes, age, tax_regime, deductions=0, tds=0, advance_tax=0, residential_status='Resident', scenarios=DEFAULT_SCENARIOS, seed=0, year=None):
+    # Draw `scenarios` outcomes of the income heads in `incomes` (a tuple of
+    # (field, distribution) pairs; missing heads count as 0) and report the
+    # distribution of the tax with cess. Underpayment is the chance that the
+    # tax exceeds what TDS and advance tax already cover. The seed makes a
+    # rerun with the same inputs return the same figures.
+    rules = get_rules(year)
+    regime = regime_key(tax_regime)
+    specs = dict(incomes)
+    unknown = set(specs) - set(INCOME_FIELDS[segment])
+    if unknown:
+        raise ValueError(f'Unknown income head(s): {", ".join(sorted(unknown))}')
+    if min(age, deductions, tds, advance_tax) < 0 or scenarios < 1:
+        raise ValueError('All values must be non-negative.')
+    if regime == NEW_REGIME and not NEW_REGIME_DEDUCTIONS[segment]:
+        deductions = 0
+    table = rules.table(slab_segment(segment, residential_status), regime, age)
+
+    rng = np.random.default_rng(seed)
+    total = np.zeros(scenarios)
+    scratch = np.empty(scenarios)
+    for name in INCOME_FIELDS[segment]:
+        add_draws(total, scratch, rng, check_distribution(name, specs.get(name, 0.0)))
+
+    # Taxable income; draws below the deductions owe no tax
+    total -= deductions
+    np.maximum(total, 0.0, out=total)
+    tax = table.tax(total)
+    tax *= 1 + rules.cess_rate
+
+    # Read-only views: the cached result is shared by every caller and session
+    paid = tds + advance_tax
+    return MappingProxyType({
+        'scenarios': scenarios,
+        'expected_tax': float(tax.mean()),
+        'std_tax': float(tax.std()),
+        'percentiles': MappingProxyType(dict(zip(PERCENTILES, np.percentile(tax, PERCENTILES).tolist()))),
+        'underpaid_probability': float(np.count_nonzero(tax > paid) / scenarios),
+        'expected_shortfall': float(np.maximum(tax - paid, 0.0, out=total).mean()),
+    })
@@ -0,0 +1,92 @@
+import bisect
+
+import numpy as np
+
+OLD_REGIME = 'old'
+NEW_REGIME = 'new'
+NEW_REGIME_LABELS = ('New Tax Regime', NEW_REGIME)
+
+# Age bands: below 60, senior (60 to 79) and super senior (80 or more)
+BELOW_60 = 'below_60'
+SENIOR = 'senior'
+SUPER_SENIOR = 'super_senior'
+AGE_BANDS = (BELOW_60, SENIOR, SUPER_SENIOR)
+AGE_BAND_LIMITS = (60, 80)
+
+
+def is_scalar(value):
+    # Plain Python numbers skip the comparatively slow np.ndim check
+    return type(value) in (int, float) or np.ndim(value) == 0
+
+
+class SlabTable:
+    # A slab schedule compiled into boundary and cumulative-tax arrays.
+    # Inside slab i the tax is intercepts[i] + income * rates[i], so looking
+    # up a tax is one search over the upper edges plus one multiply-add.
+    __slots__ = ('key', 'lower', 'rates', 'cumulative', 'intercepts', 'edges', 'free_limit', '_edges', '_rates', '_intercepts')
+
+    def __init__(self, key, lower, rates):
+        lower = np.array(lower, dtype=np.float64)
+        rates = np.array(rates, dtype=np.float64)
+        if lower.ndim != 1 or lower.shape != rates.shape or len(lower) == 0:
+            raise ValueError(f'Slab table {key}: bounds and rates must be non-empty and of equal length.')
+        if lower[0] != 0 or np.any(np.diff(lower) <= 0):
+            raise ValueError(f'Slab table {key}: bounds must start at 0 and be strictly increasing.')
+        if np.any(rates < 0) or np.any(rates >= 1):
+            raise ValueError(f'Slab table {key}: rates must be between 0 and 1.')
+
+        # Tax due at the lower bound of each slab
+        cumulative = np.concatenate(([0.0], np.cumsum(np.diff(lower) * rates[:-1])))
+
+        self.key = key
+        self.lower = lower
+        self.rates = rates
+        self.cumulative = cumulative
+        self.intercepts = cumulative - lower * rates
+        self.edges = lower[1:]
+        # Income up to which no tax is due
+        taxed = np.flatnonzero(rates > 0)
+        self.free_limit = float(lower[taxed[0]]) if len(taxed) else float('inf')
+        for array in (self.lower, self.rates, self.cumulative, self.intercepts, self.edges):
+            array.setflags(write=False)
+
+        # Plain Python copies keep the scalar path free of NumPy overhead
+        self._edges = tuple(self.edges.tolist())
+        self._rates = tuple(rates.tolist())
+        self._intercepts = tuple(self.intercepts.tolist())
+
+    def bracket(self, taxable_income):
+        # Index of the slab each income falls in (incomes at a boundary belong to the upper slab)
+        if is_scalar(taxable_income):
+            return bisect.bisect_right(self._edges, taxable_income)
+        return np.searchsorted(self.edges, taxable_income, side='right')
+
+    def rate_below(self, taxable_income):
+        # Rate on the last rupee below each income, i.e. the tax saved per rupee of deduction
+        if is_scalar(taxable_income):
+            return self._rates[bisect.bisect_left(self._edges, taxable_income)]
+        return self.rates[np.searchsorted(self.edges, taxable_income, side='left')]
+
+    def tax(self, taxable_income):
+        if is_scalar(taxable_income):
+            i = bisect.bisect_right(self._edges, taxable_income)
+            return self._intercepts[i] + taxable_income * self._rates[i]
+        income = np.asarray(taxable_income, dtype=np.float64)
+        i = np.searchsorted(self.edges, income, side='right')
+        return self.intercepts[i] + income * self.rates[i]
+
+    def __repr__(self):
+        return f'SlabTable({self.key!r}, slabs={len(self.lower)})'
+
+
+def regime_key(tax_regime):
+    # The pages pass the selectbox label; anything but the New Tax Regime is the old one
+    return NEW_REGIME if tax_regime in NEW_REGIME_LABELS else OLD_REGIME
+
+
+def age_band(age):
+    if age < AGE_BAND_LIMITS[0]:
+        return BELOW_60
+    if age < AGE_BAND_LIMITS[1]:
+        return SENIOR
+    return SUPER_SENIOR
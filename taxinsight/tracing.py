@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+
+# Opt in with TAXINSIGHT_TRACE=1; traces are appended to TAXINSIGHT_TRACE_DIR
+ENABLED = os.environ.get('TAXINSIGHT_TRACE', '') not in ('', '0')
+TRACE_DIR = os.environ.get('TAXINSIGHT_TRACE_DIR', 'traces')
+
+# Each Streamlit session reruns its script on its own thread
+_local = threading.local()
+_file_lock = threading.Lock()
+
+
+class Trace:
+    # Timed spans of a single rerun
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.thread = threading.get_ident()
+        self.spans = []  # (name, start offset, duration, depth) in seconds
+        self.depth = 0
+        self.duration = None
+
+    def chrome_events(self):
+        # Complete ('X') events in the Chrome trace event format, in microseconds
+        base = self.wall_started * 1e6
+        events = [{'name': self.name, 'ph': 'X', 'ts': base, 'dur': (self.duration or 0) * 1e6, 'pid': os.getpid(), 'tid': self.thread}]
+        for name, offset, duration, depth in self.spans:
+            events.append({'name': name, 'ph': 'X', 'ts': base + offset * 1e6, 'dur': duration * 1e6, 'pid': os.getpid(), 'tid': self.thread, 'args': {'depth': depth}})
+        return events
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.trace.depth += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ended = time.perf_counter()
+        self.trace.depth -= 1
+        self.trace.spans.append((self.name, self.started - self.trace.started, ended - self.started, self.trace.depth))
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+def start(name='rerun'):
+    if not ENABLED:
+        return None
+    _local.trace = Trace(name)
+    return _local.trace
+
+
+def current():
+    return getattr(_local, 'trace', None)
+
+
+def span(name):
+    # Costs a thread-local lookup when tracing is off or no rerun is traced
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name)
+
+
+def finish():
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return None
+    _local.trace = None
+    trace.duration = time.perf_counter() - trace.started
+    return trace
+
+
+def export(trace, directory=None):
+    # Append the rerun to this process's trace file. The JSON array is left
+    # open, which chrome://tracing and Perfetto both accept.
+    directory = directory or TRACE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'taxinsight-{os.getpid()}.json')
+    lines = ''.join(json.dumps(event) + ',\n' for event in trace.chrome_events())
+    with _file_lock:
+        new = not os.path.exists(path)
+        with open(path, 'a') as f:
+            if new:
+                f.write('[\n')
+            f.write(lines)
+    return path
+
+
+def render_panel(trace, path=None):
+    import streamlit as st
+
+    from taxinsight.memo import cache_stats
+
+    with st.sidebar.expander('Debug: rerun timings'):
+        st.write(f'Total rerun: {trace.duration * 1000:.1f} ms')
+        spans = sorted(trace.spans, key=lambda s: s[1])  # in start order, nested spans indented
+        st.table({
+            'Phase': ['· ' * depth + name for name, _, _, depth in spans],
+            'ms': [f'{duration * 1000:.2f}' for _, _, duration, _ in spans],
+        })
+        stats = cache_stats()
+        if stats:
+            st.table({
+                'Cache': list(stats),
+                'Hits': [s['hits'] for s in stats.values()],
+                'Misses': [s['misses'] for s in stats.values()],
+                'Size': [s['size'] for s in stats.values()],
+            })
+        if path:
+            st.caption(f'Chrome trace: {path}')